@@ -0,0 +1,269 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import pathlib
+import struct
+import time
+from array import array
+from datetime import datetime
+
+import spacy
+
+from matchers import AhoCorasickEngine
+
+# Precompiled alias index: a small JSON header followed by 8-byte aligned
+# arrays (interned string table, alias → skill table and a flattened
+# Aho–Corasick automaton). Workers mmap the file read-only, so they share
+# pages and skip JSON parsing and pattern compilation at startup.
+#
+#   MAGIC | u64 header length | JSON header | sections...
+
+MAGIC = b"SKIX0001"
+SECTIONS = {
+    # name: array typecode
+    "string_offsets": "Q",  # n_strings + 1 offsets into string_data
+    "string_data": "B",     # utf-8; skill ids first, then aliases
+    "alias_skills": "I",    # per alias: index of its skill id
+    "node_edges": "I",      # n_nodes + 1 offsets into edge_keys / edge_targets
+    "edge_keys": "Q",       # token attribute ids, sorted within each node
+    "edge_targets": "I",
+    "fail": "I",
+    "node_outputs": "I",    # n_nodes + 1 offsets into out_skills / out_lengths
+    "out_skills": "I",
+    "out_lengths": "I",     # alias length in tokens
+    # Token keys of every alias, so incremental builds only tokenize changed skills
+    "alias_key_offsets": "Q",  # n_aliases + 1 offsets into alias_key_ids
+    "alias_key_ids": "Q",
+}
+
+def alias_map_version(alias2id: dict[str, str]) -> str:
+    payload = json.dumps(sorted(alias2id.items()), ensure_ascii=False).encode()
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+def build_index(
+    alias2id: dict[str, str],
+    nlp,
+    attr: str = "LOWER",
+    alias_keys: dict[str, list[int]] | None = None,
+    watermark: str | None = None,
+) -> bytes:
+    # `watermark` is the core.esco_skills.synced_at the index is current up to
+    skill_ids = sorted(set(alias2id.values()))
+    skill_index = {skill_id: i for i, skill_id in enumerate(skill_ids)}
+    aliases = list(alias2id.keys())
+
+    strings = [s.encode() for s in skill_ids + aliases]
+    string_offsets = array("Q", [0])
+    for s in strings:
+        string_offsets.append(string_offsets[-1] + len(s))
+
+    engine = AhoCorasickEngine(nlp, alias2id, attr, alias_keys)
+    alias_key_offsets, alias_key_ids = array("Q", [0]), array("Q")
+    for alias in aliases:
+        alias_key_ids.extend(engine.alias_keys[alias])
+        alias_key_offsets.append(len(alias_key_ids))
+    node_edges, edge_keys, edge_targets = array("I", [0]), array("Q"), array("I")
+    node_outputs, out_skills, out_lengths = array("I", [0]), array("I"), array("I")
+    for edges, outputs in zip(engine.goto, engine.out):
+        for key in sorted(edges):
+            edge_keys.append(key)
+            edge_targets.append(edges[key])
+        node_edges.append(len(edge_keys))
+        for skill_id, length in outputs:
+            out_skills.append(skill_index[skill_id])
+            out_lengths.append(length)
+        node_outputs.append(len(out_skills))
+
+    arrays = {
+        "string_offsets": string_offsets,
+        "string_data": array("B", b"".join(strings)),
+        "alias_skills": array("I", [skill_index[alias2id[a]] for a in aliases]),
+        "node_edges": node_edges,
+        "edge_keys": edge_keys,
+        "edge_targets": edge_targets,
+        "fail": array("I", engine.fail),
+        "node_outputs": node_outputs,
+        "out_skills": out_skills,
+        "out_lengths": out_lengths,
+        "alias_key_offsets": alias_key_offsets,
+        "alias_key_ids": alias_key_ids,
+    }
+
+    header = {
+        "version": alias_map_version(alias2id),
+        "attr": attr,
+        "n_skills": len(skill_ids),
+        "n_aliases": len(aliases),
+        "n_nodes": len(engine.goto),
+        "watermark": watermark,
+        "sections": {},
+    }
+    body = bytearray()
+    for name, arr in arrays.items():
+        body.extend(b"\0" * (-len(body) % 8))
+        data = arr.tobytes()
+        header["sections"][name] = [len(body), len(data)]
+        body.extend(data)
+
+    # Section offsets are relative to the first 8-byte boundary after the header
+    header_bytes = json.dumps(header).encode()
+    header_bytes += b" " * (-(len(MAGIC) + 8 + len(header_bytes)) % 8)
+    return MAGIC + struct.pack("<Q", len(header_bytes)) + header_bytes + bytes(body)
+
+class AliasIndex:
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a skill alias index")
+        (header_len,) = struct.unpack_from("<Q", self._mm, len(MAGIC))
+        base = len(MAGIC) + 8
+        header = json.loads(self._mm[base : base + header_len])
+        base += header_len
+
+        self.version: str = header["version"]
+        self.attr: str = header["attr"]
+        self.n_skills: int = header["n_skills"]
+        self.n_aliases: int = header["n_aliases"]
+        self.watermark: str | None = header.get("watermark")
+
+        view = memoryview(self._mm)
+        for name, (offset, length) in header["sections"].items():
+            section = view[base + offset : base + offset + length]
+            setattr(self, name, section.cast(SECTIONS[name]) if SECTIONS[name] != "B" else section)
+
+        # Skill ids are looked up on every match, decode them once
+        self.skill_ids: list[str] = [self.string(i) for i in range(self.n_skills)]
+
+    def string(self, i: int) -> str:
+        return bytes(self.string_data[self.string_offsets[i] : self.string_offsets[i + 1]]).decode()
+
+    def alias2id(self) -> dict[str, str]:
+        return {
+            self.string(self.n_skills + i): self.skill_ids[self.alias_skills[i]]
+            for i in range(self.n_aliases)
+        }
+
+    def alias_keys(self) -> dict[str, list[int]] | None:
+        # None for indexes written before the key sections existed
+        if not hasattr(self, "alias_key_ids"):
+            return None
+        offsets, keys = self.alias_key_offsets, self.alias_key_ids
+        return {
+            self.string(self.n_skills + i): keys[offsets[i] : offsets[i + 1]].tolist()
+            for i in range(self.n_aliases)
+        }
+
+# Status import_esco.py's sync gives skills that left ESCO; they have no aliases
+DELETED_STATUS = "deleted"
+
+def skill_aliases(label: str, alt_labels) -> list[str]:
+    # Same shape as scripts/exportSkillAliasMap.ts: lowercase label + altLabels
+    aliases = [label.lower()]
+    for alias in alt_labels if isinstance(alt_labels, list) else []:
+        if isinstance(alias, str):
+            aliases.append(alias.lower())
+    return aliases
+
+def db_engine():
+    from dotenv import load_dotenv
+    from sqlalchemy import create_engine
+
+    load_dotenv()
+    return create_engine(os.getenv("DATABASE_URL"))
+
+def load_alias_map_from_db() -> tuple[dict[str, str], str | None]:
+    # Returns (alias map, watermark = latest synced_at). synced_at is set by
+    # import_esco.py on every insert, update and soft delete; modified_at is
+    # ESCO's own date and doesn't move when a skill is removed.
+    from sqlalchemy import text
+
+    alias2id = {}
+    watermark = None
+    with db_engine().connect() as conn:
+        for skill_id, label, alt_labels, status, synced_at in conn.execute(
+            text("SELECT id, label, alt_labels, status, synced_at FROM core.esco_skills")
+        ):
+            if status != DELETED_STATUS:
+                for alias in skill_aliases(label, alt_labels):
+                    alias2id[alias] = str(skill_id)
+            if synced_at is not None and (watermark is None or synced_at > watermark):
+                watermark = synced_at
+    return alias2id, watermark.isoformat() if watermark else None
+
+def patch_alias_map_from_db(alias2id: dict[str, str], watermark: str) -> tuple[dict[str, str], str, int]:
+    # Re-reads only skills synced after the watermark, plus the id list to drop
+    # hard-deleted skills and pick up any live skill missing from the map.
+    # Returns (patched map, new watermark, changed skills).
+    # Aliases shared between skills resolve to whichever was written last, so
+    # an occasional full build (--full) settles any drift from the export order.
+    from sqlalchemy import text
+
+    since = datetime.fromisoformat(watermark)
+    with db_engine().connect() as conn:
+        live_ids = {
+            str(skill_id)
+            for (skill_id,) in conn.execute(
+                text("SELECT id FROM core.esco_skills WHERE status IS DISTINCT FROM :deleted"), {"deleted": DELETED_STATUS}
+            )
+        }
+        restored = list(live_ids - set(alias2id.values()))
+        changed = conn.execute(
+            text(
+                "SELECT id, label, alt_labels, status, synced_at FROM core.esco_skills "
+                "WHERE synced_at > :since OR CAST(id AS TEXT) = ANY(:restored) ORDER BY synced_at"
+            ),
+            {"since": since, "restored": restored},
+        ).all()
+
+    changed_ids = {str(skill_id) for skill_id, *_ in changed}
+    patched = {
+        alias: skill_id
+        for alias, skill_id in alias2id.items()
+        if skill_id in live_ids and skill_id not in changed_ids
+    }
+    for skill_id, label, alt_labels, status, synced_at in changed:
+        if status != DELETED_STATUS:
+            for alias in skill_aliases(label, alt_labels):
+                patched[alias] = str(skill_id)
+        if synced_at is not None:
+            since = max(since, synced_at)
+    return patched, since.isoformat(), len(changed_ids | (set(alias2id.values()) - live_ids))
+
+def main(alias_map: str | None, out: str, attr: str, full: bool):
+    start = time.perf_counter()
+    alias_keys = watermark = None
+    previous = AliasIndex(out) if not alias_map and not full and pathlib.Path(out).exists() else None
+    if alias_map:
+        alias2id = json.loads(pathlib.Path(alias_map).read_text())
+    elif previous is not None and previous.watermark and previous.attr == attr:
+        # Incremental: patch the previous index's map and reuse its token keys
+        previous_map = previous.alias2id()
+        alias2id, watermark, changed = patch_alias_map_from_db(previous_map, previous.watermark)
+        if alias2id == previous_map and watermark == previous.watermark:
+            print(f"{out} is up to date (watermark {watermark}) ✅")
+            return
+        alias_keys = previous.alias_keys()
+        print(f"{changed:,} skills changed since {previous.watermark}")
+    else:
+        alias2id, watermark = load_alias_map_from_db()
+
+    nlp = spacy.load("en_core_web_sm", disable=["ner", "parser"]) if attr == "LEMMA" else spacy.blank("en")
+    data = build_index(alias2id, nlp, attr, alias_keys, watermark)
+
+    # Write next to the target and rename, so running workers never see a partial file
+    tmp = f"{out}.tmp"
+    pathlib.Path(tmp).write_bytes(data)
+    os.replace(tmp, out)
+    print(f"Compiled {len(alias2id):,} aliases into {out} ({len(data) / 1e6:.1f} MB) in {time.perf_counter() - start:.1f}s ✅")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile the skill alias map into a memory-mappable index")
+    parser.add_argument("--alias_map", help="skill_alias_map.json from exportSkillAliasMap.ts (default: read esco_skills)")
+    parser.add_argument("--out", default="skill_index.bin")
+    parser.add_argument("--attr", default="LOWER", choices=["LOWER", "LEMMA"])
+    parser.add_argument("--full", action="store_true", help="Rebuild from all of esco_skills instead of patching --out")
+    args = parser.parse_args()
+    main(args.alias_map, args.out, args.attr, args.full)
@@ -1,23 +1,809 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field, model_validator
+from typing import Literal, NamedTuple
 import spacy
-from spacy.matcher import PhraseMatcher
-import json, pathlib
+import asyncio, json, os, pathlib, random, signal, tempfile, threading, time
+from concurrent.futures.process import BrokenProcessPool
 
-app = FastAPI()
-nlp = spacy.load("en_core_web_sm", disable=["ner", "parser"])  # fast!
-matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+from alias_index import AliasIndex, alias_map_version
+from cache import ResultCache, cache_key
+from codec import MsgpackRoute, encode
+from corpus import SIZES, make_corpus
+from fuzzy import FuzzyMatcher
+from matchers import build_matcher, split_windows
+from normalize import PROFILES, job_text, normalize_many
+from occupations import OccupationTable, load_relations_csv
+from pool import MatcherPool, PoolSaturated
+import pdftext
 
-# Load { alias → skill_id } built during ETL of ESCO
-alias2id = json.loads(pathlib.Path("skill_alias_map.json").read_text())
-patterns = [nlp.make_doc(alias) for alias in alias2id.keys()]
-matcher.add("SKILLS", patterns)
+# LOWER (default) only needs tokens, so a blank English pipeline (tokenizer only,
+# same rules as en_core_web_sm) is enough. LEMMA needs tagger + lemmatizer.
+MATCH_ATTR = os.getenv("EXTRACTOR_MATCH_ATTR", "LOWER").upper()
+if MATCH_ATTR not in ("LOWER", "LEMMA"):
+    raise ValueError(f"Unsupported EXTRACTOR_MATCH_ATTR: {MATCH_ATTR}")
+
+# Matcher engine: "phrase" (spaCy PhraseMatcher) or "aho" (token-level Aho–Corasick).
+# Unset means aho when loading a .bin index, which it walks in place, instead
+# of decoding every alias and rebuilding a PhraseMatcher in each process
+MATCHER_ENGINE = os.getenv("EXTRACTOR_MATCHER")
+
+if MATCH_ATTR == "LEMMA":
+    nlp = spacy.load("en_core_web_sm", disable=["ner", "parser"])
+else:
+    nlp = spacy.blank("en")
+
+# Prefer the precompiled index from alias_index.py (mmapped, shared between
+# workers); fall back to { alias → skill_id } JSON built during ETL of ESCO
+INDEX_PATH = os.getenv("EXTRACTOR_INDEX", "skill_index.bin")
+ALIAS_MAP_PATH = os.getenv("EXTRACTOR_ALIAS_MAP", "skill_alias_map.json")
+
+# Poll the alias map/index every N seconds and reload on change (0 = off)
+RELOAD_INTERVAL = float(os.getenv("EXTRACTOR_RELOAD_INTERVAL", "0"))
+ADMIN_TOKEN = os.getenv("EXTRACTOR_ADMIN_TOKEN")
+# Set by serve.py: the parent then does the polling and reloading (SIGHUP) and
+# re-forks its workers, so every worker picks up the new map
+SERVE_PID = int(os.getenv("EXTRACTOR_SERVE_PID", "0"))
+
+# Default Dice threshold for /extract/fuzzy, same as utils/extractSkills.ts
+FUZZY_THRESHOLD = float(os.getenv("EXTRACTOR_FUZZY_THRESHOLD", "0.9"))
+if not 0 < FUZZY_THRESHOLD <= 1:
+    raise ValueError(f"EXTRACTOR_FUZZY_THRESHOLD must be in (0, 1]: {FUZZY_THRESHOLD}")
+
+# Occupation → essential/optional skills for ?occupation_id= scoring, from
+# `python occupations.py` or ESCO's occupationSkillRelations CSV (off when missing)
+OCCUPATION_SKILLS_PATH = os.getenv("EXTRACTOR_OCCUPATION_SKILLS", "occupation_skills.csv")
+OPTIONAL_WEIGHT = float(os.getenv("EXTRACTOR_OPTIONAL_WEIGHT", "0.5"))
+occupation_table = (
+    OccupationTable(load_relations_csv(OCCUPATION_SKILLS_PATH), OPTIONAL_WEIGHT)
+    if pathlib.Path(OCCUPATION_SKILLS_PATH).exists()
+    else None
+)
+
+# Result cache: in-memory LRU entries (0 = off) plus an optional SQLite file
+# holding at most EXTRACTOR_CACHE_DB_SIZE rows
+CACHE_SIZE = int(os.getenv("EXTRACTOR_CACHE_SIZE", "10000"))
+CACHE_DB = os.getenv("EXTRACTOR_CACHE_DB")
+CACHE_DB_SIZE = int(os.getenv("EXTRACTOR_CACHE_DB_SIZE", "1000000"))
+cache = ResultCache(CACHE_SIZE, CACHE_DB, CACHE_DB_SIZE) if CACHE_SIZE > 0 or CACHE_DB else None
+
+# Prometheus metrics at /metrics; prometheus_client is only imported when on
+METRICS = os.getenv("EXTRACTOR_METRICS", "0") == "1"
+if METRICS:
+    import metrics
+
+# Process pool for matching (0 = match on the threadpool). Up to MAX_PENDING
+# chunks may wait for a pool worker before requests get 503 + Retry-After.
+POOL_WORKERS = int(os.getenv("EXTRACTOR_POOL_WORKERS", "0"))
+MAX_PENDING = int(os.getenv("EXTRACTOR_MAX_PENDING", str(POOL_WORKERS * 4)))
+RETRY_AFTER = os.getenv("EXTRACTOR_RETRY_AFTER", "1")
+
+# Resume PDFs are parsed on their own pool (0 = threadpool), so big uploads
+# don't hold up matching, in chunks of pages that are parsed in parallel
+PDF_WORKERS = int(os.getenv("EXTRACTOR_PDF_WORKERS", "2"))
+PDF_PAGES_PER_CHUNK = int(os.getenv("EXTRACTOR_PDF_PAGES_PER_CHUNK", "4"))
+PDF_MAX_BYTES = int(os.getenv("EXTRACTOR_PDF_MAX_BYTES", str(20 * 1024 * 1024)))
+
+# Warm-up at startup and before a reloaded matcher is swapped in: documents
+# from EXTRACTOR_WARMUP_CORPUS (one per line) or a synthetic corpus of aliases
+WARMUP_DOCS = int(os.getenv("EXTRACTOR_WARMUP_DOCS", "200"))
+WARMUP_CORPUS = os.getenv("EXTRACTOR_WARMUP_CORPUS")
+
+class LoadedMatcher(NamedTuple):
+    matcher: object
+    version: str
+    alias2id: dict[str, str]
+    index: AliasIndex | None
+    # Sorted skill ids; ?skills=index responses refer to skills by position here
+    skill_table: list[str]
+    skill_positions: dict[str, int]
+    engine: str
+
+def alias_source() -> pathlib.Path:
+    index_path = pathlib.Path(INDEX_PATH)
+    return index_path if index_path.exists() else pathlib.Path(ALIAS_MAP_PATH)
+
+def load_matcher() -> LoadedMatcher:
+    source = alias_source()
+    if source.suffix == ".bin":
+        engine = MATCHER_ENGINE or "aho"
+        index = AliasIndex(str(source))
+        alias2id = index.alias2id() if engine != "aho" else {}
+        version = index.version
+    else:
+        engine = MATCHER_ENGINE or "phrase"
+        index = None
+        alias2id = json.loads(source.read_text())
+        version = alias_map_version(alias2id)
+    matcher = build_matcher(engine, nlp, alias2id, MATCH_ATTR, index)
+    skill_table = index.skill_ids if index is not None else sorted(set(alias2id.values()))
+    skill_positions = {skill_id: i for i, skill_id in enumerate(skill_table)}
+    return LoadedMatcher(matcher, version, alias2id, index, skill_table, skill_positions, engine)
+
+# Requests read `current` once and use that snapshot throughout, so a reload
+# only has to rebind the name: in-flight requests finish on the old matcher.
+current = load_matcher()
+reload_lock = threading.Lock()
+
+# Pool workers fork with `current` loaded, so each reload gets a fresh pool;
+# chunks already queued on the old one finish there
+matcher_pool: MatcherPool | None = None
+pdf_pool: MatcherPool | None = None
+
+pool_lock = threading.Lock()
+
+def start_pool():
+    global matcher_pool
+    old, matcher_pool = matcher_pool, MatcherPool(POOL_WORKERS, MAX_PENDING, current.version)
+    if old is not None:
+        old.shutdown()
+
+def start_pdf_pool():
+    global pdf_pool
+    old, pdf_pool = pdf_pool, MatcherPool(PDF_WORKERS, PDF_WORKERS * 4)
+    if old is not None:
+        old.shutdown()
+
+def replace_broken_pool(pool: MatcherPool):
+    # A pool with a dead worker can't run anything again; the first request
+    # (or /readyz) to notice swaps in a new one, later ones find it replaced
+    with pool_lock:
+        if pool is matcher_pool:
+            print("Matcher pool broken (worker died), restarting it")
+            start_pool()
+        elif pool is pdf_pool:
+            print("PDF pool broken (worker died), restarting it")
+            start_pdf_pool()
+
+def pool_restarting() -> HTTPException:
+    return HTTPException(status_code=503, detail="Worker pool restarting, retry later", headers={"Retry-After": RETRY_AFTER})
+
+def reload_matcher() -> bool:
+    # Returns False when the new map can't be loaded (e.g. a half-written JSON
+    # file from exportSkillAliasMap.ts); the current matcher keeps serving
+    global current
+    try:
+        loaded = load_matcher()
+        if loaded.version != current.version:
+            warm_up(loaded)
+            current = loaded
+            if matcher_pool is not None:
+                start_pool()
+            print(f"Alias map reloaded, version {loaded.version}")
+        return True
+    except Exception as exc:
+        print(f"Alias map reload failed, keeping version {current.version}: {exc!r}")
+        return False
+    finally:
+        reload_lock.release()
+
+def watch_alias_source():
+    last_mtime = None
+    while True:
+        try:
+            mtime = alias_source().stat().st_mtime
+        except FileNotFoundError:
+            mtime = last_mtime
+        if last_mtime is None:
+            last_mtime = mtime
+        # last_mtime only moves on a successful load, so a failed one is retried next tick
+        elif mtime != last_mtime and reload_lock.acquire(blocking=False):
+            if reload_matcher():
+                last_mtime = mtime
+        time.sleep(RELOAD_INTERVAL)
+
+fuzzy_lock = threading.Lock()
+fuzzy_cache: dict[str, FuzzyMatcher] = {}
+
+def get_fuzzy(loaded: LoadedMatcher) -> FuzzyMatcher:
+    # The trigram index is only needed by /extract/fuzzy, build it on first use
+    with fuzzy_lock:
+        if loaded.version not in fuzzy_cache:
+            alias2id = loaded.alias2id or loaded.index.alias2id()
+            fuzzy_cache.clear()
+            fuzzy_cache[loaded.version] = FuzzyMatcher(alias2id)
+        return fuzzy_cache[loaded.version]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if RELOAD_INTERVAL > 0 and not SERVE_PID:
+        threading.Thread(target=watch_alias_source, daemon=True).start()
+    # Started here rather than at import, so under serve.py each forked server
+    # process owns its pool
+    global ready
+    if POOL_WORKERS > 0:
+        start_pool()
+    if PDF_WORKERS > 0 and pdftext.pypdf is not None:
+        start_pdf_pool()
+    ready = True
+    yield
+    ready = False
+    if matcher_pool is not None:
+        matcher_pool.shutdown()
+    if pdf_pool is not None:
+        pdf_pool.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+app.router.route_class = MsgpackRoute
+if METRICS:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+@app.exception_handler(PoolSaturated)
+async def pool_saturated(request: Request, exc: PoolSaturated):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Extractor is saturated, retry later"},
+        headers={"Retry-After": RETRY_AFTER},
+    )
+
+# Texts longer than this many chars are matched in overlapping windows, so a
+# huge document never becomes one giant Doc; windows are at most twice this
+# long (see split_windows), which stays under nlp.max_length
+WINDOW_CHARS = min(int(os.getenv("EXTRACTOR_WINDOW_CHARS", "100000")), nlp.max_length // 2)
+
+# nlp.pipe defaults for /extract/batch, overridable per request up to these caps
+# (each n_process starts that many spaCy processes for the request)
+BATCH_SIZE = int(os.getenv("EXTRACTOR_BATCH_SIZE", "64"))
+N_PROCESS = int(os.getenv("EXTRACTOR_N_PROCESS", "1"))
+MAX_BATCH_SIZE = int(os.getenv("EXTRACTOR_MAX_BATCH_SIZE", "10000"))
+MAX_N_PROCESS = min(N_PROCESS, os.cpu_count() or 1) if N_PROCESS > 1 else 1
+
+# Normalization profile (see normalize.py) when a request doesn't pick one
+NORMALIZE = os.getenv("EXTRACTOR_NORMALIZE", "none")
+if NORMALIZE not in PROFILES:
+    raise ValueError(f"Unsupported EXTRACTOR_NORMALIZE: {NORMALIZE}")
+
+NormalizeProfile = Literal["none", "html", "clean"]
+
+class JobIn(BaseModel):
+    # Raw JSearch fields, so clients don't have to build and clean the text themselves
+    job_description: str = ""
+    job_highlights: dict[str, list[str]] | None = None
+
+    def document(self) -> str:
+        return job_text(self.job_description, self.job_highlights)
 
 class In(BaseModel):
-    text: str
+    # Either text or the job fields
+    text: str | None = None
+    job_description: str | None = None
+    job_highlights: dict[str, list[str]] | None = None
+    normalize: NormalizeProfile | None = None
+
+    @model_validator(mode="after")
+    def check_input(self):
+        if self.text is None and self.job_description is None and self.job_highlights is None:
+            raise ValueError("text or job_description/job_highlights is required")
+        return self
+
+    def document(self) -> str:
+        if self.text is not None:
+            return self.text
+        return job_text(self.job_description or "", self.job_highlights)
+
+class BatchIn(BaseModel):
+    texts: list[str] = []
+    jobs: list[JobIn] = []
+    batch_size: int | None = Field(default=None, ge=1, le=MAX_BATCH_SIZE)
+    n_process: int | None = Field(default=None, ge=1, le=MAX_N_PROCESS)
+    normalize: NormalizeProfile | None = None
+
+class FuzzyIn(BaseModel):
+    texts: list[str]
+    threshold: float | None = Field(default=None, gt=0, le=1)
+
+def span_details(spans: set[tuple[int, int, str, str]]) -> dict:
+    # Every match with its char offsets, plus per-skill count and first position;
+    # skill_ids are ordered by first occurrence
+    matches = [
+        {"skill_id": skill_id, "start": start, "end": end, "text": text}
+        for start, end, skill_id, text in sorted(spans)
+    ]
+    skills = {}
+    for m in matches:
+        stats = skills.setdefault(m["skill_id"], {"count": 0, "first": m["start"]})
+        stats["count"] += 1
+    return {"skill_ids": list(skills), "matches": matches, "skills": skills}
+
+def match_texts(
+    loaded: LoadedMatcher,
+    texts: list[str],
+    batch_size: int = BATCH_SIZE,
+    n_process: int = 1,
+    spans: bool = False,
+    normalize: str = "none",
+):
+    # Returns (result per text, per-text (tokenize, match) seconds or None when metrics are off).
+    # A result is the list of skill ids, or with spans=True the span_details() dict.
+    # Texts are normalized here, i.e. only on cache misses and off the event loop.
+    # Windows stream through nlp.pipe tagged with their text's position and char offset;
+    # matches are merged per text, and spans seen in two overlapping windows once.
+    texts = normalize_many(texts, normalize)
+    overlap = max(loaded.matcher.max_length - 1, 0)
+    windows = (
+        (window, (i, offset))
+        for i, text in enumerate(texts)
+        for offset, window in split_windows(text, WINDOW_CHARS, overlap)
+    )
+    docs = nlp.pipe(windows, as_tuples=True, batch_size=batch_size, n_process=n_process)
+    found = [set() for _ in texts]
+    timings = [[0.0, 0.0] for _ in texts] if METRICS else None
+    start = time.perf_counter() if METRICS else 0.0
+    for doc, (i, offset) in docs:
+        if METRICS:
+            tokenized = time.perf_counter()
+        matches = loaded.matcher(doc)
+        if spans:
+            for skill_id, token_start, token_end in matches:
+                span = doc[token_start:token_end]
+                found[i].add((offset + span.start_char, offset + span.end_char, skill_id, span.text))
+        else:
+            found[i].update(skill_id for skill_id, _, _ in matches)
+        if METRICS:
+            matched = time.perf_counter()
+            timings[i][0] += tokenized - start
+            timings[i][1] += matched - tokenized
+            start = matched
+
+    results = [span_details(f) if spans else list(f) for f in found]
+    if spans and normalize != "none":
+        # Span offsets refer to the normalized text, so send it along
+        for result, text in zip(results, texts):
+            result["text"] = text
+    return results, [tuple(t) for t in timings] if METRICS else None
+
+def pool_match_texts(texts: list[str], batch_size: int, spans: bool, normalize: str):
+    # Runs in a pool worker, whose `current` is the matcher it was forked with
+    return match_texts(current, texts, batch_size, spans=spans, normalize=normalize)
+
+async def run_matching(
+    loaded: LoadedMatcher,
+    texts: list[str],
+    batch_size: int,
+    n_process: int,
+    admit: bool,
+    spans: bool = False,
+    normalize: str = "none",
+) -> list:
+    # A chunk whose pool broke is retried once on the replacement pool
+    for _ in range(2):
+        pool = matcher_pool
+        if pool is None or pool.version != loaded.version:
+            results, timings = await run_in_threadpool(match_texts, loaded, texts, batch_size, n_process, spans, normalize)
+            break
+        # Spread big batches over all pool workers, one nlp.pipe batch per chunk
+        chunks = [(texts[i : i + batch_size], batch_size, spans, normalize) for i in range(0, len(texts), batch_size)]
+        try:
+            outputs = await pool.map(pool_match_texts, chunks, admit)
+        except BrokenProcessPool:
+            await run_in_threadpool(replace_broken_pool, pool)
+            continue
+        results, timings = [], []
+        for chunk_results, chunk_timings in outputs:
+            results.extend(chunk_results)
+            timings.extend(chunk_timings or [])
+        break
+    else:
+        raise pool_restarting()
+    if METRICS:
+        metrics.observe_phases(timings)
+    return results
+
+def cache_lookup(texts: list[str], version: str, attr: str) -> tuple[list[str], list]:
+    keys = [cache_key(text, version, attr) for text in texts]
+    return keys, cache.get_many(keys)
+
+async def extract_many(
+    loaded: LoadedMatcher,
+    texts: list[str],
+    batch_size: int = BATCH_SIZE,
+    n_process: int = 1,
+    admit: bool = True,
+    spans: bool = False,
+    normalize: str = "none",
+) -> list:
+    # Serve repeated documents from the cache and only match the misses.
+    # The cache holds skill ids only, so span requests always match.
+    # Keys are over the raw text plus profile, so hits skip normalization too.
+    # Hashing and cache lookups (SQLite on the disk tier) block, so they run
+    # in the threadpool, one hop per direction for the whole batch.
+    if cache is None or spans:
+        results = await run_matching(loaded, texts, batch_size, n_process, admit, spans, normalize)
+    else:
+        attr = MATCH_ATTR if normalize == "none" else f"{MATCH_ATTR}:{normalize}"
+        keys, results = await run_in_threadpool(cache_lookup, texts, loaded.version, attr)
+        misses = [i for i, skill_ids in enumerate(results) if skill_ids is None]
+        if misses:
+            matched = await run_matching(loaded, [texts[i] for i in misses], batch_size, n_process, admit, normalize=normalize)
+            for i, skill_ids in zip(misses, matched):
+                results[i] = skill_ids
+            await run_in_threadpool(cache.put_many, [(keys[i], results[i]) for i in misses])
+    if METRICS:
+        metrics.observe_documents(texts, [r["skill_ids"] for r in results] if spans else results)
+    return results
+
+def warmup_aliases(loaded: LoadedMatcher, k: int = 1000) -> list[str]:
+    # A fixed sample of aliases for the synthetic corpus; from a .bin index only
+    # the sampled ones are decoded, not the whole alias table
+    rng = random.Random(42)
+    if loaded.index is not None and not loaded.alias2id:
+        index = loaded.index
+        picks = rng.sample(range(index.n_aliases), min(k, index.n_aliases))
+        return [index.string(index.n_skills + i) for i in sorted(picks)]
+    aliases = list(loaded.alias2id)
+    return [aliases[i] for i in sorted(rng.sample(range(len(aliases)), min(k, len(aliases))))]
+
+def warm_up(loaded: LoadedMatcher) -> dict:
+    # The first nlp() calls load lexemes and grow the vocab/string store lazily.
+    # Doing it here, before serve.py forks, also leaves the warm pages shared.
+    if WARMUP_DOCS <= 0:
+        return {"docs": 0, "seconds": 0.0}
+    if WARMUP_CORPUS:
+        texts = pathlib.Path(WARMUP_CORPUS).read_text().splitlines()[:WARMUP_DOCS]
+    else:
+        texts = make_corpus(warmup_aliases(loaded), WARMUP_DOCS, SIZES["median"])
+    start = time.perf_counter()
+    match_texts(loaded, texts, normalize=NORMALIZE)
+    seconds = time.perf_counter() - start
+    print(f"Warmed up alias map {loaded.version} on {len(texts)} docs in {seconds:.2f}s")
+    return {"docs": len(texts), "seconds": round(seconds, 3)}
+
+warmup = warm_up(current)
+
+# Set once pools are up; /readyz reports 503 until then and again on shutdown
+ready = False
+
+def encode_response(request: Request, content: dict, version: str) -> Response:
+    # JSON, or msgpack when the client sends Accept: application/msgpack
+    start = time.perf_counter()
+    body, media_type = encode(request, content)
+    if METRICS:
+        metrics.observe_serialize(time.perf_counter() - start)
+    return Response(body, media_type=media_type, headers={"X-Alias-Map-Version": version})
+
+def format_result(loaded: LoadedMatcher, result, skills: str) -> dict:
+    # "index" refers to skills by position in the /skills/table of the same alias-map version
+    if not isinstance(result, dict):
+        result = {"skill_ids": result}
+    if skills != "index":
+        return result
+    pos = loaded.skill_positions
+    formatted = {"skill_ids": [pos[skill_id] for skill_id in result["skill_ids"]]}
+    if "matches" in result:
+        formatted["matches"] = [{**m, "skill_id": pos[m["skill_id"]]} for m in result["matches"]]
+        formatted["skills"] = {pos[skill_id]: stats for skill_id, stats in result["skills"].items()}
+    return formatted
+
+SkillFormat = Literal["id", "index"]
+
+def get_occupation_table(occupation_id: str) -> OccupationTable:
+    # Checked before matching, so a bad occupation id costs no extraction
+    if occupation_table is None:
+        raise HTTPException(status_code=501, detail="Occupation scoring needs EXTRACTOR_OCCUPATION_SKILLS")
+    if occupation_id not in occupation_table.rows:
+        raise HTTPException(status_code=404, detail=f"Unknown occupation: {occupation_id}")
+    return occupation_table
+
+def skill_ids_of(result) -> list[str]:
+    return result["skill_ids"] if isinstance(result, dict) else result
 
 @app.post("/extract")
-def extract(payload: In):
-    doc = nlp(payload.text)
-    skill_ids = { alias2id[m.text.lower()] for m in matcher(doc) }
-    return {"skill_ids": list(skill_ids)}
+async def extract(
+    payload: In,
+    request: Request,
+    skills: SkillFormat = "id",
+    spans: bool = False,
+    occupation_id: str | None = None,
+):
+    # spans=true adds every match's char offsets and text plus per-skill count/first position;
+    # occupation_id adds coverage of that occupation's essential/optional skills (by skill id)
+    table = get_occupation_table(occupation_id) if occupation_id else None
+    loaded = current
+    normalize = payload.normalize or NORMALIZE
+    [result] = await extract_many(loaded, [payload.document()], spans=spans, normalize=normalize)
+    content = {**format_result(loaded, result, skills), "alias_map_version": loaded.version}
+    if table is not None:
+        [content["occupation"]] = table.score(occupation_id, [skill_ids_of(result)])
+    return encode_response(request, content, loaded.version)
+
+@app.post("/extract/batch")
+async def extract_batch(
+    payload: BatchIn,
+    request: Request,
+    skills: SkillFormat = "id",
+    spans: bool = False,
+    occupation_id: str | None = None,
+):
+    table = get_occupation_table(occupation_id) if occupation_id else None
+    loaded = current
+    # Results keep input order: one per text, then one per job
+    results = await extract_many(
+        loaded,
+        payload.texts + [job.document() for job in payload.jobs],
+        batch_size=payload.batch_size or BATCH_SIZE,
+        n_process=payload.n_process or MAX_N_PROCESS,
+        spans=spans,
+        normalize=payload.normalize or NORMALIZE,
+    )
+    formatted = [format_result(loaded, result, skills) for result in results]
+    if table is not None:
+        # All documents against the occupation in one vectorized pass
+        scores = table.score(occupation_id, [skill_ids_of(result) for result in results])
+        for result, score in zip(formatted, scores):
+            result["occupation"] = score
+    content = {"results": formatted, "alias_map_version": loaded.version}
+    return encode_response(request, content, loaded.version)
+
+@app.get("/skills/table")
+def skills_table(request: Request):
+    # index → skill id table for ?skills=index; immutable per version, so clients
+    # cache it and revalidate with If-None-Match
+    loaded = current
+    etag = f'"{loaded.version}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response = encode_response(request, {"skill_ids": loaded.skill_table, "alias_map_version": loaded.version}, loaded.version)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "public, max-age=3600"
+    return response
+
+@app.post("/extract/fuzzy")
+def extract_fuzzy(payload: FuzzyIn, response: Response):
+    loaded = current
+    response.headers["X-Alias-Map-Version"] = loaded.version
+    fuzzy = get_fuzzy(loaded)
+    threshold = payload.threshold if payload.threshold is not None else FUZZY_THRESHOLD
+    return {
+        "results": [{"matches": fuzzy(text, threshold)} for text in payload.texts],
+        "alias_map_version": loaded.version,
+    }
+
+async def extract_ndjson(loaded: LoadedMatcher, items: list[dict], normalize: str) -> bytes:
+    # Lines that failed to parse have no "text" and are echoed back in place.
+    # A running stream waits for the pool instead of being rejected midway.
+    texts = [item["text"] for item in items if "text" in item]
+    results = iter(await extract_many(loaded, texts, admit=False, normalize=normalize))
+    start = time.perf_counter()
+    out = []
+    for item in items:
+        if "text" in item:
+            out.append(json.dumps({"id": item.get("id"), "skill_ids": next(results)}))
+        else:
+            out.append(json.dumps(item))
+    body = ("\n".join(out) + "\n").encode()
+    if METRICS:
+        metrics.observe_serialize(time.perf_counter() - start)
+    return body
+
+class DuplexStreamingResponse(StreamingResponse):
+    # StreamingResponse normally polls receive() for disconnects, which would
+    # swallow the request body we are still reading. request.stream() already
+    # raises ClientDisconnect, so just stream.
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+async def read_ndjson(request: Request):
+    # Parse the body line by line as it arrives, never holding more than one chunk
+    buf = b""
+    async for chunk in request.stream():
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buf.strip():
+        yield buf
+
+@app.post("/extract/stream")
+async def extract_stream(request: Request, normalize: NormalizeProfile | None = None):
+    # Input: one {"id": ..., "text": ...} (or job_description/job_highlights) per line.
+    # Output: one {"id": ..., "skill_ids": [...]} per line, flushed every BATCH_SIZE docs.
+    # The body is only pulled as fast as the client reads results, so a whole dump
+    # can be piped through one connection.
+    loaded = current
+    normalize = normalize or NORMALIZE
+
+    async def results():
+        batch = []
+        async for line in read_ndjson(request):
+            try:
+                item = json.loads(line)
+                if "text" not in item and "job_description" in item:
+                    job = JobIn(**item)
+                    item = {"id": item.get("id"), "text": job.document()}
+                if not isinstance(item.get("text"), str):
+                    raise ValueError
+            except (ValueError, AttributeError):
+                item = {"error": "invalid line", "line": line[:200].decode(errors="replace")}
+            batch.append(item)
+            if len(batch) >= BATCH_SIZE:
+                yield await extract_ndjson(loaded, batch, normalize)
+                batch = []
+        if batch:
+            yield await extract_ndjson(loaded, batch, normalize)
+
+    return DuplexStreamingResponse(
+        results(),
+        media_type="application/x-ndjson",
+        headers={"X-Alias-Map-Version": loaded.version},
+    )
+
+def write_temp_pdf(data: bytes) -> str:
+    fd, path = tempfile.mkstemp(prefix="extractor-", suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    return path
+
+def remove_temp_pdf(path: str):
+    with suppress(FileNotFoundError):
+        os.remove(path)
+
+async def parse_pdf_pages(path: str, start: int, admit: bool) -> tuple[int, list[str]]:
+    for _ in range(2):
+        pool = pdf_pool
+        if pool is None:
+            return await run_in_threadpool(pdftext.extract_pages, path, start, start + PDF_PAGES_PER_CHUNK)
+        try:
+            [result] = await pool.map(pdftext.extract_pages, [(path, start, start + PDF_PAGES_PER_CHUNK, True)], admit)
+            return result
+        except BrokenProcessPool:
+            await run_in_threadpool(replace_broken_pool, pool)
+    raise pool_restarting()
+
+@app.post("/extract/pdf")
+async def extract_pdf(
+    request: Request,
+    skills: SkillFormat = "id",
+    stream: bool = False,
+    normalize: NormalizeProfile | None = None,
+    occupation_id: str | None = None,
+):
+    # Body: the raw PDF (Content-Type: application/pdf). Returns the document's text,
+    # page count and skills; with stream=true NDJSON instead: one {"page", "text",
+    # "skill_ids"} per page as soon as its chunk is parsed, then {"pages", "skill_ids"}.
+    if pdftext.pypdf is None:
+        raise HTTPException(status_code=501, detail="PDF support needs pypdf")
+    if int(request.headers.get("content-length") or 0) > PDF_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="PDF too large")
+    table = get_occupation_table(occupation_id) if occupation_id else None
+    data = await request.body()
+    if len(data) > PDF_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="PDF too large")
+    loaded = current
+    normalize = normalize or NORMALIZE
+
+    # The first chunk also gives the page count; the other chunks then go to
+    # the pool together. Only the first one is subject to admission control.
+    # The temp file is removed once every chunk is parsed (or the stream ends).
+    path = await run_in_threadpool(write_temp_pdf, data)
+    try:
+        page_count, first = await parse_pdf_pages(path, 0, admit=True)
+    except (pdftext.pypdf.errors.PyPdfError, ValueError) as exc:
+        remove_temp_pdf(path)
+        raise HTTPException(status_code=422, detail=f"Unreadable PDF: {exc}")
+    except BaseException:
+        remove_temp_pdf(path)
+        raise
+    rest = [
+        (start, asyncio.ensure_future(parse_pdf_pages(path, start, admit=False)))
+        for start in range(PDF_PAGES_PER_CHUNK, page_count, PDF_PAGES_PER_CHUNK)
+    ]
+
+    if not stream:
+        try:
+            pages = first + [text for _, task in rest for text in (await task)[1]]
+        except (pdftext.pypdf.errors.PyPdfError, ValueError) as exc:
+            raise HTTPException(status_code=422, detail=f"Unreadable PDF: {exc}")
+        finally:
+            for _, task in rest:
+                task.cancel()
+            remove_temp_pdf(path)
+        text = "\n".join(pages)
+        [result] = await extract_many(loaded, [text], normalize=normalize)
+        content = {
+            **format_result(loaded, result, skills),
+            "text": text,
+            "pages": page_count,
+            "alias_map_version": loaded.version,
+        }
+        if table is not None:
+            [content["occupation"]] = table.score(occupation_id, [skill_ids_of(result)])
+        return encode_response(request, content, loaded.version)
+
+    async def results():
+        found = {}  # skill ids of the whole document in order of first page
+        found_ids = {}  # the same by skill id, for occupation scoring
+        try:
+            for start, task in [(0, None), *rest]:
+                try:
+                    pages = first if task is None else (await task)[1]
+                except (pdftext.pypdf.errors.PyPdfError, ValueError) as exc:
+                    last = min(start + PDF_PAGES_PER_CHUNK, page_count)
+                    yield (json.dumps({"pages": [start + 1, last], "error": str(exc)}) + "\n").encode()
+                    continue
+                chunk_results = await extract_many(loaded, pages, admit=False, normalize=normalize)
+                lines = []
+                for page, (text, result) in enumerate(zip(pages, chunk_results), start + 1):
+                    formatted = format_result(loaded, result, skills)
+                    found.update(dict.fromkeys(formatted["skill_ids"]))
+                    found_ids.update(dict.fromkeys(skill_ids_of(result)))
+                    lines.append(json.dumps({"page": page, "text": text, **formatted}))
+                yield ("\n".join(lines) + "\n").encode()
+            summary = {"pages": page_count, "skill_ids": list(found), "alias_map_version": loaded.version}
+            if table is not None:
+                [summary["occupation"]] = table.score(occupation_id, [list(found_ids)])
+            yield (json.dumps(summary) + "\n").encode()
+        finally:
+            for _, task in rest:
+                task.cancel()
+            remove_temp_pdf(path)
+
+    # The background task covers a stream that never started
+    return StreamingResponse(
+        results(),
+        media_type="application/x-ndjson",
+        headers={"X-Alias-Map-Version": loaded.version},
+        background=BackgroundTask(remove_temp_pdf, path),
+    )
+
+@app.post("/admin/reload", status_code=202)
+def admin_reload(x_admin_token: str | None = Header(default=None)):
+    # Builds the new matcher in the background and swaps it in when ready
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    if SERVE_PID:
+        # Only this worker got the request; the serve.py parent reloads for all of them
+        os.kill(SERVE_PID, signal.SIGHUP)
+        return {"status": "reloading", "alias_map_version": current.version}
+    if not reload_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="Reload already in progress")
+    threading.Thread(target=reload_matcher, daemon=True).start()
+    return {"status": "reloading", "alias_map_version": current.version}
+
+@app.get("/healthz")
+def healthz():
+    # Liveness: the process is up and serving requests
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz():
+    # Readiness: warmed up, alias map loaded and pools started. A pool that
+    # lost a worker is replaced here too, and reports not ready until it is.
+    broken = [pool for pool in (matcher_pool, pdf_pool) if pool is not None and not pool.alive()]
+    for pool in broken:
+        replace_broken_pool(pool)
+    content = {
+        "status": "restarting pool" if broken else "ready" if ready else "starting",
+        "alias_map_version": current.version,
+        "warmup": warmup,
+    }
+    return JSONResponse(content, status_code=200 if ready and not broken else 503)
+
+@app.get("/version")
+def version():
+    return {
+        "alias_map_version": current.version,
+        "matcher": current.engine,
+        "attr": MATCH_ATTR,
+        "occupations": len(occupation_table) if occupation_table is not None else 0,
+    }
+
+@app.get("/cache/stats")
+def cache_stats():
+    return cache.stats() if cache is not None else {"enabled": False}
+
+if METRICS:
+    state_collector = metrics.register_state(lambda: {
+        "version": current.version,
+        "matcher": current.engine,
+        "attr": MATCH_ATTR,
+        "cache": cache.stats() if cache is not None else None,
+    })
+
+    @app.get("/metrics")
+    def prometheus_metrics():
+        body, content_type = metrics.render(state_collector)
+        return Response(body, media_type=content_type)
@@ -0,0 +1,157 @@
+import argparse
+import http.client
+import json
+import pathlib
+import resource
+import statistics
+import sys
+import time
+from urllib.parse import urlparse
+
+from corpus import SIZES, make_corpus
+
+# Extractor benchmarks on a reproducible synthetic corpus (ESCO aliases mixed
+# into filler text, no network needed). Results are printed as JSON and can be
+# compared against a saved baseline:
+#
+#   python bench.py inprocess --out bench.json
+#   python bench.py http --url http://localhost:8000 --baseline bench.json
+#   python bench.py pipelines   # full en_core_web_sm vs tokenizer-only
+
+FALLBACK_ALIASES = ["python", "machine learning", "sql", "project management", "data analysis"]
+
+def load_aliases(alias_map: str) -> list[str]:
+    path = pathlib.Path(alias_map)
+    if path.suffix == ".bin" and path.exists():
+        from alias_index import AliasIndex
+        return sorted(AliasIndex(str(path)).alias2id())
+    if path.exists():
+        return sorted(json.loads(path.read_text()))
+    return FALLBACK_ALIASES
+
+def summarize(latencies: list[float], total: float) -> dict:
+    q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "docs": len(latencies),
+        "docs_per_sec": round(len(latencies) / total, 2),
+        "p50_ms": round(q[49] * 1000, 3),
+        "p95_ms": round(q[94] * 1000, 3),
+        "p99_ms": round(q[98] * 1000, 3),
+    }
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def run_timed(fn, corpus: list[str]) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    for text in corpus:
+        t = time.perf_counter()
+        fn(text)
+        latencies.append(time.perf_counter() - t)
+    return summarize(latencies, time.perf_counter() - start)
+
+def bench_inprocess(corpora: dict[str, list[str]]) -> dict:
+    # Startup = importing app: pipeline load, alias map/index and matcher build
+    start = time.perf_counter()
+    import app
+    startup = time.perf_counter() - start
+
+    # Call the matcher directly, bypassing the result cache
+    def extract(text):
+        app.match_texts(app.current, [text])
+
+    return {
+        "mode": "inprocess",
+        "matcher": app.current.engine,
+        "attr": app.MATCH_ATTR,
+        "alias_map_version": app.current.version,
+        "startup_s": round(startup, 3),
+        "sizes": {name: run_timed(extract, corpus) for name, corpus in corpora.items()},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def bench_http(corpora: dict[str, list[str]], url: str) -> dict:
+    target = urlparse(url)
+    conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=60)
+    path = target.path.rstrip("/") + "/extract"
+
+    def extract(text):
+        # Unique suffix per call so the service's result cache never answers
+        body = json.dumps({"text": f"{text} {time.perf_counter_ns()}"})
+        conn.request("POST", path, body, {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"{path} returned {response.status}")
+
+    return {
+        "mode": "http",
+        "url": url,
+        "startup_s": None,
+        "sizes": {name: run_timed(extract, corpus) for name, corpus in corpora.items()},
+        "peak_rss_mb": None,
+    }
+
+def bench_pipelines(aliases: list[str], corpus: list[str]) -> dict:
+    import spacy
+    from matchers import PhraseMatcherEngine
+
+    alias2id = {alias: alias for alias in aliases}
+    results = []
+    for name, nlp, attr in [
+        ("en_core_web_sm (tagger+lemmatizer)", spacy.load("en_core_web_sm", disable=["ner", "parser"]), "LOWER"),
+        ("blank English (tokenizer only)", spacy.blank("en"), "LOWER"),
+        ("en_core_web_sm (tagger+lemmatizer)", spacy.load("en_core_web_sm", disable=["ner", "parser"]), "LEMMA"),
+    ]:
+        matcher = PhraseMatcherEngine(nlp, alias2id, attr)
+        results.append({"pipeline": name, "attr": attr, **run_timed(lambda text: matcher(nlp(text)), corpus)})
+    return {"mode": "pipelines", "results": results, "peak_rss_mb": peak_rss_mb()}
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, stats in result.get("sizes", {}).items():
+        base = baseline.get("sizes", {}).get(name)
+        if not base:
+            continue
+        if stats["docs_per_sec"] < base["docs_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: {stats['docs_per_sec']} docs/s vs baseline {base['docs_per_sec']}")
+        if stats["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {stats['p95_ms']}ms vs baseline {base['p95_ms']}ms")
+    return regressions
+
+def main(args):
+    aliases = load_aliases(args.alias_map)
+    corpora = {name: make_corpus(aliases, args.docs, words, seed=i) for i, (name, words) in enumerate(SIZES.items())}
+
+    if args.mode == "inprocess":
+        result = bench_inprocess(corpora)
+    elif args.mode == "http":
+        result = bench_http(corpora, args.url)
+    else:
+        result = bench_pipelines(aliases, corpora["median"])
+    result["corpus"] = {"docs_per_size": args.docs, "words": SIZES, "aliases": len(aliases)}
+
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.out:
+        pathlib.Path(args.out).write_text(output)
+
+    if args.baseline:
+        regressions = compare(result, json.loads(pathlib.Path(args.baseline).read_text()), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the skill extractor")
+    parser.add_argument("mode", choices=["inprocess", "http", "pipelines"])
+    parser.add_argument("--alias_map", default="skill_alias_map.json", help="Alias map JSON or compiled .bin index")
+    parser.add_argument("--docs", type=int, default=200, help="Documents per size bucket")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--out", help="Write the JSON result to this file")
+    parser.add_argument("--baseline", help="Previous JSON result to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed slowdown before failing")
+    main(parser.parse_args())
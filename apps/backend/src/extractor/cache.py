@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# Content-addressed cache of extraction results: sha256(alias-map version +
+# match attr + text) → skill ids. A bounded in-memory LRU sits in front of an
+# optional SQLite tier that survives restarts and is shared by workers.
+
+def cache_key(text: str, version: str, attr: str) -> str:
+    # Only surrounding whitespace is dropped: inner whitespace produces tokens
+    # that can break a multi-word match, so collapsing it could change results
+    return hashlib.sha256(f"{version}:{attr}\0{text.strip()}".encode()).hexdigest()
+
+class ResultCache:
+    def __init__(self, max_items: int = 10_000, db_path: str | None = None, max_disk_items: int = 1_000_000):
+        self.max_items = max_items
+        self.memory: OrderedDict[str, list[str]] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+
+        # Disk rows beyond max_disk_items are dropped oldest-write first (rowid
+        # order), which also ages out results of alias-map versions no longer served
+        self.db_path = db_path
+        self.max_disk_items = max_disk_items
+        self.disk_errors = 0
+        self._db = None
+        self._db_pid = None
+
+    @property
+    def db(self) -> sqlite3.Connection | None:
+        # SQLite connections must not cross a fork, so each process opens its own
+        if self.db_path and self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, skill_ids TEXT NOT NULL)")
+            self._db_pid = os.getpid()
+        return self._db
+
+    def get(self, key: str) -> list[str] | None:
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.hits["memory"] += 1
+                return self.memory[key]
+            if self.db_path:
+                # A locked or broken disk tier is a miss, never a failed request
+                try:
+                    row = self.db.execute("SELECT skill_ids FROM results WHERE key = ?", (key,)).fetchone()
+                except sqlite3.Error:
+                    self.disk_errors += 1
+                    row = None
+                if row:
+                    self.hits["disk"] += 1
+                    skill_ids = json.loads(row[0])
+                    self._remember(key, skill_ids)
+                    return skill_ids
+            self.misses += 1
+            return None
+
+    def get_many(self, keys: list[str]) -> list[list[str] | None]:
+        return [self.get(key) for key in keys]
+
+    def put(self, key: str, skill_ids: list[str]):
+        self.put_many([(key, skill_ids)])
+
+    def put_many(self, items: list[tuple[str, list[str]]]):
+        # One SQLite transaction for the whole batch instead of one per row;
+        # if the disk write fails the results stay in memory only
+        with self.lock:
+            for key, skill_ids in items:
+                self._remember(key, skill_ids)
+            if not self.db_path or not items:
+                return
+            try:
+                db = self.db
+                db.execute("BEGIN")
+                try:
+                    db.executemany(
+                        "INSERT OR REPLACE INTO results (key, skill_ids) VALUES (?, ?)",
+                        [(key, json.dumps(skill_ids)) for key, skill_ids in items],
+                    )
+                    db.execute(
+                        "DELETE FROM results WHERE rowid <= (SELECT max(rowid) FROM results) - ?",
+                        (self.max_disk_items,),
+                    )
+                    db.execute("COMMIT")
+                except BaseException:
+                    if db.in_transaction:
+                        db.execute("ROLLBACK")
+                    raise
+            except sqlite3.Error:
+                self.disk_errors += 1
+
+    def _remember(self, key: str, skill_ids: list[str]):
+        self.memory[key] = skill_ids
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_items:
+            self.memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self.lock:
+            hits = self.hits["memory"] + self.hits["disk"]
+            total = hits + self.misses
+            return {
+                "enabled": True,
+                "size": len(self.memory),
+                "max_items": self.max_items,
+                "disk": self.db_path is not None,
+                "max_disk_items": self.max_disk_items if self.db_path else None,
+                "disk_errors": self.disk_errors,
+                "hits_memory": self.hits["memory"],
+                "hits_disk": self.hits["disk"],
+                "misses": self.misses,
+                "hit_ratio": round(hits / total, 4) if total else 0.0,
+            }
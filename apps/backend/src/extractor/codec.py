@@ -0,0 +1,47 @@
+import json
+
+from fastapi import Request
+from fastapi.routing import APIRoute
+
+try:
+    import msgpack
+except ImportError:  # JSON only
+    msgpack = None
+
+# Content negotiation for the extractor: requests may be sent as msgpack
+# (Content-Type: application/msgpack) and responses are msgpack when the
+# client asks for it (Accept: application/msgpack), JSON otherwise.
+
+MSGPACK = "application/msgpack"
+
+class MsgpackRequest(Request):
+    async def json(self):
+        if not hasattr(self, "_json"):
+            self._json = msgpack.unpackb(await self.body())
+        return self._json
+
+class MsgpackRoute(APIRoute):
+    # FastAPI only parses JSON bodies, so msgpack requests are relabelled as
+    # JSON and decoded by MsgpackRequest.json() into the same models
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request):
+            if msgpack is not None and request.headers.get("content-type", "").startswith(MSGPACK):
+                scope = dict(request.scope)
+                scope["headers"] = [
+                    (name, b"application/json" if name == b"content-type" else value)
+                    for name, value in scope["headers"]
+                ]
+                request = MsgpackRequest(scope, request.receive)
+            return await handler(request)
+
+        return route_handler
+
+def wants_msgpack(request: Request) -> bool:
+    return msgpack is not None and MSGPACK in request.headers.get("accept", "")
+
+def encode(request: Request, content) -> tuple[bytes, str]:
+    if wants_msgpack(request):
+        return msgpack.packb(content), MSGPACK
+    return json.dumps(content).encode(), "application/json"
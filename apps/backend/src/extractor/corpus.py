@@ -0,0 +1,25 @@
+import random
+
+# Synthetic documents: aliases mixed into filler text. Used by bench.py and by
+# app.warm_up when no EXTRACTOR_WARMUP_CORPUS is given.
+
+FILLER = (
+    "we are looking for a motivated engineer to join our team and work closely "
+    "with stakeholders across the business to deliver high quality results"
+).split()
+
+# Words per document: a short snippet, a typical posting and a pasted resume/scrape
+SIZES = {"short": 50, "median": 400, "long": 5000}
+
+def make_corpus(aliases: list[str], n_docs: int, words_per_doc: int, seed: int = 42) -> list[str]:
+    rng = random.Random(seed)
+    docs = []
+    for _ in range(n_docs):
+        words = []
+        while len(words) < words_per_doc:
+            if aliases and rng.random() < 0.1:
+                words.extend(rng.choice(aliases).split())
+            else:
+                words.append(rng.choice(FILLER))
+        docs.append(" ".join(words))
+    return docs
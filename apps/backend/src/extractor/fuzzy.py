@@ -0,0 +1,142 @@
+import re
+
+import numpy as np
+
+# Fuzzy n-gram matching, the Python counterpart of utils/extractSkills.ts.
+# Cleaned aliases go into a character-trigram inverted index; every 1–4-gram of
+# a document is scored against the aliases sharing a trigram, using the Dice
+# coefficient over trigram sets. Dice >= t needs t/(2-t)·|A| <= |B| <= (2-t)/t·|A|,
+# so posting lists are kept sorted by label size and only that slice is expanded.
+
+WORD_RE = re.compile(r"\W+")
+PAREN_RE = re.compile(r"\s*\(.*?\)")
+MAX_N = 4
+CHUNK_NGRAMS = 4096  # ngrams looked up per pass
+MAX_PAIRS = 1_000_000  # (ngram, label) candidates scored per numpy pass, bounds peak memory
+
+def clean_skill_name(name: str) -> str:
+    return PAREN_RE.sub("", name.lower()).strip()
+
+def trigrams(s: str) -> set[str]:
+    padded = f" {s} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+def generate_ngrams(words: list[str], max_n: int = MAX_N) -> list[str]:
+    return [" ".join(words[i : i + n]) for n in range(1, max_n + 1) for i in range(len(words) - n + 1)]
+
+class FuzzyMatcher:
+    def __init__(self, alias2id: dict[str, str]):
+        label2id = {}
+        for alias, skill_id in alias2id.items():
+            cleaned = clean_skill_name(alias)
+            if cleaned:
+                label2id.setdefault(cleaned, skill_id)
+        self.labels = list(label2id.keys())
+        self.label_skills = list(label2id.values())
+
+        self.gram_ids: dict[str, int] = {}
+        postings: list[list[int]] = []
+        sizes = []
+        for label_id, label in enumerate(self.labels):
+            grams = trigrams(label)
+            sizes.append(len(grams))
+            for gram in grams:
+                gram_id = self.gram_ids.setdefault(gram, len(postings))
+                if gram_id == len(postings):
+                    postings.append([])
+                postings[gram_id].append(label_id)
+
+        # CSR layout: labels containing trigram g are indices[indptr[g]:indptr[g + 1]],
+        # smallest labels first. posting_keys = g * stride + label size is then
+        # sorted globally, so one searchsorted finds every size window.
+        self.indptr = np.zeros(len(postings) + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum([len(p) for p in postings])
+        self.indices = np.fromiter(
+            (i for p in postings for i in sorted(p, key=sizes.__getitem__)), dtype=np.int64, count=int(self.indptr[-1])
+        )
+        self.label_sizes = np.array(sizes, dtype=np.float64)
+        self.size_stride = max(sizes, default=0) + 1
+        self.posting_keys = np.repeat(np.arange(len(postings), dtype=np.int64), np.diff(self.indptr)) * self.size_stride
+        self.posting_keys += self.label_sizes[self.indices].astype(np.int64)
+
+    def __call__(self, text: str, threshold: float = 0.9) -> list[dict]:
+        words = [w for w in WORD_RE.split(text.lower()) if w]
+        ngrams = list(dict.fromkeys(generate_ngrams(words)))
+
+        best = {}  # skill_id → best match
+        for start in range(0, len(ngrams), CHUNK_NGRAMS):
+            chunk = ngrams[start : start + CHUNK_NGRAMS]
+            for row, label_id, score in self._score(chunk, threshold):
+                skill_id = self.label_skills[label_id]
+                if skill_id not in best or score > best[skill_id]["score"]:
+                    best[skill_id] = {
+                        "skill_id": skill_id,
+                        "alias": self.labels[label_id],
+                        "ngram": chunk[row],
+                        "score": round(score, 4),
+                    }
+        return list(best.values())
+
+    def _score(self, ngrams: list[str], threshold: float):
+        rows, gram_ids, query_sizes = [], [], []
+        for row, ngram in enumerate(ngrams):
+            grams = trigrams(ngram)
+            query_sizes.append(len(grams))
+            for gram in grams:
+                gram_id = self.gram_ids.get(gram)
+                if gram_id is not None:
+                    rows.append(row)
+                    gram_ids.append(gram_id)
+        if not rows:
+            return []
+
+        # Only the part of each posting list whose label size can reach the threshold
+        rows = np.array(rows, dtype=np.int64)
+        gram_ids = np.array(gram_ids, dtype=np.int64)
+        query_sizes = np.array(query_sizes, dtype=np.float64)
+        sizes = query_sizes[rows]
+        if threshold > 0:
+            min_size = np.ceil(sizes * threshold / (2 - threshold) - 1e-9)
+            max_size = np.floor(sizes * (2 - threshold) / threshold + 1e-9)
+        else:
+            min_size, max_size = np.zeros_like(sizes), np.full_like(sizes, self.size_stride)
+        base = gram_ids * self.size_stride
+        starts = np.searchsorted(self.posting_keys, base + np.maximum(min_size, 0).astype(np.int64), side="left")
+        stops = np.searchsorted(self.posting_keys, base + np.minimum(max_size, self.size_stride - 1).astype(np.int64), side="right")
+        lengths = np.maximum(stops - starts, 0)
+
+        # Split into passes of at most MAX_PAIRS candidates; rows are ascending, so
+        # an ngram never straddles two passes (one ngram alone may exceed the cap)
+        results = []
+        row_totals = np.bincount(rows, weights=lengths, minlength=len(ngrams))
+        pass_of_row = (np.cumsum(row_totals) - row_totals) // MAX_PAIRS
+        pass_of = pass_of_row[rows]
+        bounds = np.flatnonzero(np.diff(pass_of)) + 1
+        for sl in np.split(np.arange(len(rows)), bounds):
+            results.extend(self._best(rows[sl], starts[sl], lengths[sl], query_sizes, threshold))
+        return results
+
+    def _best(self, rows, starts, lengths, query_sizes, threshold: float):
+        # Expand each (ngram, trigram) pair into its posting slice
+        total = int(lengths.sum())
+        if not total:
+            return []
+        pair_rows = np.repeat(rows, lengths)
+        offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        pair_labels = self.indices[np.repeat(starts, lengths) + offsets]
+
+        # Shared trigram counts per (ngram, label), then Dice = 2|A∩B| / (|A| + |B|)
+        n_labels = len(self.labels)
+        keys, shared = np.unique(pair_rows * n_labels + pair_labels, return_counts=True)
+        rows_u, labels_u = keys // n_labels, keys % n_labels
+        dice = 2.0 * shared / (query_sizes[rows_u] + self.label_sizes[labels_u])
+
+        keep = dice >= threshold
+        rows_u, labels_u, dice = rows_u[keep], labels_u[keep], dice[keep]
+
+        # Best label per ngram, like findBestMatch
+        order = np.lexsort((-dice, rows_u))
+        rows_u, labels_u, dice = rows_u[order], labels_u[order], dice[order]
+        first = np.ones(len(rows_u), dtype=bool)
+        first[1:] = rows_u[1:] != rows_u[:-1]
+        return zip(rows_u[first].tolist(), labels_u[first].tolist(), dice[first].tolist())
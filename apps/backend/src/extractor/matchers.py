@@ -0,0 +1,182 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+
+from spacy.matcher import PhraseMatcher
+
+# Matcher engines for the extractor. Both take { alias → skill_id } and return
+# (skill_id, start, end) token spans for a Doc, so they are interchangeable.
+# `max_length` is the longest alias in tokens, which sizes window overlaps.
+
+WORD_RE = re.compile(r"\S+")
+
+class PhraseMatcherEngine:
+    def __init__(self, nlp, alias2id: dict[str, str], attr: str = "LOWER"):
+        self.vocab = nlp.vocab
+        self.matcher = PhraseMatcher(nlp.vocab, attr=attr)
+
+        # One match key per skill, so a lemma match maps back to its skill even
+        # when the surface text differs from the alias
+        aliases = list(alias2id.keys())
+        patterns_by_skill = defaultdict(list)
+        self.max_length = 0
+        for alias, doc in zip(aliases, nlp.pipe(aliases)):
+            if len(doc):
+                patterns_by_skill[alias2id[alias]].append(doc)
+                self.max_length = max(self.max_length, len(doc))
+        for skill_id, patterns in patterns_by_skill.items():
+            self.matcher.add(skill_id, patterns)
+
+    def __call__(self, doc) -> list[tuple[str, int, int]]:
+        strings = self.vocab.strings
+        return [(strings[match_id], start, end) for match_id, start, end in self.matcher(doc)]
+
+class AhoCorasickEngine:
+    # Token-level Aho–Corasick automaton over attribute ids (LOWER/LEMMA hashes).
+    # Matching walks the doc once, so cost grows with text length and number of
+    # matches, not with alias count.
+    def __init__(self, nlp, alias2id: dict[str, str], attr: str = "LOWER", alias_keys: dict[str, list[int]] | None = None):
+        self.attr = attr
+        self.goto: list[dict[int, int]] = [{}]
+        self.out: list[list[tuple[str, int]]] = [[]]
+        self.max_length = 0
+
+        # Token keys per alias; aliases already in `alias_keys` (from a previous
+        # index build) are not tokenized again
+        self.alias_keys = {alias: alias_keys[alias] for alias in alias2id if alias_keys and alias in alias_keys}
+        new = [alias for alias in alias2id if alias not in self.alias_keys]
+        for alias, doc in zip(new, nlp.pipe(new)):
+            self.alias_keys[alias] = doc.to_array(attr).tolist()
+        for alias, skill_id in alias2id.items():
+            if self.alias_keys[alias]:
+                self._add(self.alias_keys[alias], skill_id)
+        self.fail = self._link()
+
+    def _add(self, keys: list[int], skill_id: str):
+        state = 0
+        for key in keys:
+            nxt = self.goto[state].get(key)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][key] = nxt
+                self.goto.append({})
+                self.out.append([])
+            state = nxt
+        self.max_length = max(self.max_length, len(keys))
+        entry = (skill_id, len(keys))
+        if entry not in self.out[state]:
+            self.out[state].append(entry)
+
+    def _link(self) -> list[int]:
+        # BFS over the trie; each node's failure link points to its longest proper
+        # suffix that is also a trie path, and inherits that node's outputs
+        fail = [0] * len(self.goto)
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for key, nxt in self.goto[state].items():
+                f = fail[state]
+                while f and key not in self.goto[f]:
+                    f = fail[f]
+                fail[nxt] = self.goto[f].get(key, 0) if state else 0
+                self.out[nxt].extend(self.out[fail[nxt]])
+                queue.append(nxt)
+        return fail
+
+    def __call__(self, doc) -> list[tuple[str, int, int]]:
+        goto, fail, out = self.goto, self.fail, self.out
+        matches = []
+        state = 0
+        for i, key in enumerate(doc.to_array(self.attr).tolist()):
+            while state and key not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(key, 0)
+            for skill_id, length in out[state]:
+                matches.append((skill_id, i + 1 - length, i + 1))
+        return matches
+
+class IndexedAhoCorasickEngine:
+    # The AhoCorasickEngine automaton read straight from a memory-mapped
+    # AliasIndex (see alias_index.py); edges are binary-searched in place.
+    def __init__(self, index):
+        self.index = index
+        self.attr = index.attr
+        self.max_length = max(index.out_lengths, default=0)
+        # Nearly every token starts from the root, keep its edges in a dict
+        lo, hi = index.node_edges[0], index.node_edges[1]
+        self.root = dict(zip(index.edge_keys[lo:hi].tolist(), index.edge_targets[lo:hi].tolist()))
+
+    def _goto(self, state: int, key: int) -> int | None:
+        if state == 0:
+            return self.root.get(key)
+        index = self.index
+        lo, hi = index.node_edges[state], index.node_edges[state + 1]
+        i = bisect_left(index.edge_keys, key, lo, hi)
+        if i < hi and index.edge_keys[i] == key:
+            return index.edge_targets[i]
+        return None
+
+    def __call__(self, doc) -> list[tuple[str, int, int]]:
+        index = self.index
+        fail, node_outputs, skill_ids = index.fail, index.node_outputs, index.skill_ids
+        matches = []
+        state = 0
+        for i, key in enumerate(doc.to_array(self.attr).tolist()):
+            nxt = self._goto(state, key)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = self._goto(state, key)
+            state = nxt or 0
+            for j in range(node_outputs[state], node_outputs[state + 1]):
+                matches.append((skill_ids[index.out_skills[j]], i + 1 - index.out_lengths[j], i + 1))
+        return matches
+
+def word_spans(text: str, piece: int):
+    for word in WORD_RE.finditer(text):
+        start, end = word.span()
+        for i in range(start, end, piece):
+            yield i, min(i + piece, end)
+
+def split_windows(text: str, size: int, overlap_words: int):
+    # Yield (char offset, window) pairs. Windows hold at least `size` chars of
+    # whole words, each starting with the last `overlap_words` words of the
+    # previous one. A match of k tokens spans at most k words, so with
+    # overlap_words = max_length - 1 every match lies whole inside some window
+    # and none is lost at a boundary.
+    # Words longer than `piece` chars (base64 blobs and the like) are cut into
+    # pieces, and a whitespace gap longer than that closes the window without
+    # overlap: two or more whitespace chars become a token no match can span.
+    # So no window exceeds 2 × size chars, whatever the text.
+    if len(text) <= size:
+        yield 0, text
+        return
+    piece = max(size // (2 * (overlap_words + 1)), 1)
+    window: list[tuple[int, int]] = []  # (start, end) of each word
+    fresh = 0  # words not yet covered by a yielded window
+    for start, end in word_spans(text, piece):
+        if window and start - window[-1][1] > piece:
+            if fresh:
+                yield window[0][0], text[window[0][0] : window[-1][1]]
+            window, fresh = [], 0
+        window.append((start, end))
+        fresh += 1
+        if window[-1][1] - window[0][0] >= size and len(window) > overlap_words:
+            yield window[0][0], text[window[0][0] : window[-1][1]]
+            window = window[len(window) - overlap_words :]
+            fresh = 0
+    if fresh:
+        yield window[0][0], text[window[0][0] : window[-1][1]]
+
+ENGINES = {
+    "phrase": PhraseMatcherEngine,
+    "aho": AhoCorasickEngine,
+}
+
+def build_matcher(engine: str, nlp, alias2id: dict[str, str], attr: str = "LOWER", index=None):
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown matcher engine: {engine} (expected one of {list(ENGINES)})")
+    if index is not None:
+        if index.attr != attr:
+            raise ValueError(f"Alias index was compiled for {index.attr}, extractor matches on {attr}")
+        if engine == "aho":
+            return IndexedAhoCorasickEngine(index)
+    return ENGINES[engine](nlp, alias2id, attr)
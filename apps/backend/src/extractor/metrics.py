@@ -0,0 +1,117 @@
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Prometheus metrics for the extractor, only imported when EXTRACTOR_METRICS=1.
+# Counters and histograms are updated on the request path; cache counters and
+# the alias-map version are read from the app state at scrape time instead.
+# Under serve.py, PROMETHEUS_MULTIPROC_DIR makes the counters and histograms
+# aggregate over all workers.
+
+REQUESTS = Counter("extractor_requests_total", "HTTP requests", ["endpoint", "status"])
+REQUEST_SECONDS = Histogram("extractor_request_seconds", "End-to-end request latency", ["endpoint"])
+PHASE_SECONDS = Histogram(
+    "extractor_phase_seconds",
+    "Per-document time spent in each extraction phase",
+    ["phase"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+DOCUMENT_CHARS = Histogram(
+    "extractor_document_chars",
+    "Size of extracted documents in characters",
+    buckets=(100, 500, 1_000, 2_500, 5_000, 10_000, 25_000, 50_000, 100_000, 1_000_000),
+)
+SKILLS_PER_DOCUMENT = Histogram(
+    "extractor_skills_per_document",
+    "Distinct skills matched per document",
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250),
+)
+
+def observe_documents(texts: list[str], results: list[list[str]]):
+    for text, skill_ids in zip(texts, results):
+        DOCUMENT_CHARS.observe(len(text))
+        SKILLS_PER_DOCUMENT.observe(len(skill_ids))
+
+def observe_phases(timings: list[tuple[float, float]]):
+    tokenize, match = PHASE_SECONDS.labels("tokenize"), PHASE_SECONDS.labels("match")
+    for tokenize_s, match_s in timings:
+        tokenize.observe(tokenize_s)
+        match.observe(match_s)
+
+def observe_serialize(seconds: float):
+    PHASE_SECONDS.labels("serialize").observe(seconds)
+
+class MetricsMiddleware:
+    # Plain ASGI middleware: BaseHTTPMiddleware would buffer the request body
+    # and break the duplex /extract/stream endpoint
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Label by route template to keep cardinality bounded
+            route = scope.get("route")
+            endpoint = getattr(route, "path", "other")
+            REQUESTS.labels(endpoint, str(status)).inc()
+            REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - start)
+
+class StateCollector:
+    # Cache counters and the alias-map version of the process serving the scrape
+    def __init__(self, get_state):
+        self.get_state = get_state
+
+    def collect(self):
+        state = self.get_state()
+        info = GaugeMetricFamily("extractor_alias_map_info", "Loaded alias map", labels=["version", "matcher", "attr"])
+        info.add_metric([state["version"], state["matcher"], state["attr"]], 1)
+        yield info
+
+        cache = state.get("cache")
+        if cache:
+            pid = str(os.getpid())
+            lookups = CounterMetricFamily("extractor_cache_lookups", "Result cache lookups", labels=["result", "pid"])
+            lookups.add_metric(["hit_memory", pid], cache["hits_memory"])
+            lookups.add_metric(["hit_disk", pid], cache["hits_disk"])
+            lookups.add_metric(["miss", pid], cache["misses"])
+            yield lookups
+            ratio = GaugeMetricFamily("extractor_cache_hit_ratio", "Result cache hit ratio", labels=["pid"])
+            ratio.add_metric([pid], cache["hit_ratio"])
+            yield ratio
+
+def register_state(get_state) -> StateCollector:
+    collector = StateCollector(get_state)
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        REGISTRY.register(collector)
+    return collector
+
+def render(state_collector: StateCollector) -> tuple[bytes, str]:
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+    # Multiprocess values live in files, so each scrape builds a fresh registry
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(state_collector)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,55 @@
+import html
+import re
+import string
+import sys
+import unicodedata
+
+# Text normalization before matching, the Python side of cleanJobText in
+# jobs/ingestJobs.ts. Profiles:
+#   none  - text as sent
+#   html  - strip tags, decode entities, NFKC, collapse whitespace; keeps
+#           punctuation so aliases like "c++" or "node.js" still match
+#   clean - html + punctuation → space + lowercase, like cleanJobText
+#           (but Unicode letters are kept instead of dropped)
+
+PROFILES = ("none", "html", "clean")
+
+# Tags and entities in one pass: a tag becomes a space, an entity its character
+MARKUP_RE = re.compile(r"<[^>]+>|&(?:#\d+|#[xX][0-9a-fA-F]+|[A-Za-z][A-Za-z0-9]*);")
+
+def _replace_markup(m: re.Match) -> str:
+    token = m.group()
+    return " " if token[0] == "<" else html.unescape(token)
+
+# Every punctuation/symbol code point (ASCII and Unicode: smart quotes, dashes,
+# bullets, ...) maps to a space; built once at import
+PUNCTUATION_TABLE = str.maketrans(
+    {c: " " for c in string.punctuation}
+    | {
+        chr(cp): " "
+        for cp in range(128, sys.maxunicode + 1)
+        if unicodedata.category(chr(cp))[0] in "PS"
+    }
+)
+
+def normalize_text(text: str, profile: str = "html") -> str:
+    if profile == "none":
+        return text
+    text = MARKUP_RE.sub(_replace_markup, text)
+    text = unicodedata.normalize("NFKC", text)
+    if profile == "clean":
+        text = text.translate(PUNCTUATION_TABLE).lower()
+    return " ".join(text.split())
+
+def normalize_many(texts: list[str], profile: str = "html") -> list[str]:
+    if profile == "none":
+        return texts
+    return [normalize_text(text, profile) for text in texts]
+
+def job_text(job_description: str, job_highlights: dict[str, list[str]] | None = None) -> str:
+    # Same fields ingestJobs.ts sends, with highlights flattened instead of JSON-stringified
+    parts = [job_description]
+    for section, items in (job_highlights or {}).items():
+        parts.append(section)
+        parts.extend(items)
+    return "\n".join(parts)
@@ -0,0 +1,124 @@
+import argparse
+import csv
+import os
+import pathlib
+
+import numpy as np
+
+# Occupation → skill table for ?occupation_id= scoring. Essential and optional
+# skills of every occupation are stored as packed bitsets over one skill
+# universe, so a batch of documents is scored against an occupation with a
+# single AND + popcount instead of per-request DB joins.
+
+RELATION_TYPES = ("essential", "optional")
+
+# Bits set per byte value
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+def extract_uuid(uri: str) -> str:
+    return uri.rstrip("/").split("/")[-1]
+
+def load_relations_csv(path: str) -> list[tuple[str, str, str]]:
+    # Either an export of occupation_skills (occupation_id, skill_id, relation_type)
+    # or ESCO's occupationSkillRelations CSV as read by ingest_esco.py
+    relations = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if "occupationUri" in row:
+                occupation_id, skill_id = extract_uuid(row["occupationUri"]), extract_uuid(row["skillUri"])
+                relation_type = row["relationType"]
+            else:
+                occupation_id, skill_id, relation_type = row["occupation_id"], row["skill_id"], row["relation_type"]
+            relations.append((occupation_id, skill_id, relation_type))
+    return relations
+
+def load_relations_from_db() -> list[tuple[str, str, str]]:
+    from dotenv import load_dotenv
+    from sqlalchemy import create_engine, text
+
+    load_dotenv()
+    engine = create_engine(os.getenv("DATABASE_URL"))
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT occupation_id, skill_id, relation_type FROM occupation_skills"))
+        return [(str(occupation_id), str(skill_id), str(relation_type)) for occupation_id, skill_id, relation_type in rows]
+
+class OccupationTable:
+    def __init__(self, relations: list[tuple[str, str, str]], optional_weight: float = 0.5):
+        self.optional_weight = optional_weight
+        self.skill_ids = sorted({skill_id for _, skill_id, _ in relations})
+        self.skill_positions = {skill_id: i for i, skill_id in enumerate(self.skill_ids)}
+        self.occupation_ids = sorted({occupation_id for occupation_id, _, _ in relations})
+        self.rows = {occupation_id: i for i, occupation_id in enumerate(self.occupation_ids)}
+
+        # Set bits straight in the packed arrays (same bit order as np.packbits);
+        # an unpacked occupations × skills matrix would be ~40 MB for ESCO
+        n_bytes = (len(self.skill_ids) + 7) // 8
+        packed = {}
+        for relation_type in RELATION_TYPES:
+            rows, positions = [], []
+            for occupation_id, skill_id, rel in relations:
+                if rel == relation_type:
+                    rows.append(self.rows[occupation_id])
+                    positions.append(self.skill_positions[skill_id])
+            bitset = np.zeros((len(self.occupation_ids), n_bytes), dtype=np.uint8)
+            positions = np.array(positions, dtype=np.int64)
+            np.bitwise_or.at(bitset, (np.array(rows, dtype=np.int64), positions >> 3), (0x80 >> (positions & 7)).astype(np.uint8))
+            packed[relation_type] = bitset
+        self.essential = packed["essential"]
+        self.optional = packed["optional"]
+        self.essential_totals = POPCOUNT[self.essential].sum(axis=1)
+        self.optional_totals = POPCOUNT[self.optional].sum(axis=1)
+
+    def __len__(self) -> int:
+        return len(self.occupation_ids)
+
+    def pack(self, results: list[list[str]]) -> np.ndarray:
+        # One bitset row per document; skills no occupation needs are dropped
+        docs = np.zeros((len(results), len(self.skill_ids)), dtype=bool)
+        for i, skill_ids in enumerate(results):
+            positions = [self.skill_positions[s] for s in skill_ids if s in self.skill_positions]
+            docs[i, positions] = True
+        return np.packbits(docs, axis=1)
+
+    def score(self, occupation_id: str, results: list[list[str]]) -> list[dict]:
+        # Coverage of the occupation's essential and optional skills for each
+        # document's matched skill ids; raises KeyError for unknown occupations
+        row = self.rows[occupation_id]
+        docs = self.pack(results)
+        essential_hits = POPCOUNT[docs & self.essential[row]].sum(axis=1)
+        optional_hits = POPCOUNT[docs & self.optional[row]].sum(axis=1)
+        missing = np.unpackbits(self.essential[row] & ~docs, axis=1, count=len(self.skill_ids))
+
+        essential_total = int(self.essential_totals[row])
+        optional_total = int(self.optional_totals[row])
+        weight_total = essential_total + self.optional_weight * optional_total
+        scores = []
+        for i in range(len(results)):
+            weighted = essential_hits[i] + self.optional_weight * optional_hits[i]
+            scores.append({
+                "occupation_id": occupation_id,
+                "essential": coverage(int(essential_hits[i]), essential_total),
+                "optional": coverage(int(optional_hits[i]), optional_total),
+                "score": round(float(weighted / weight_total), 4) if weight_total else 0.0,
+                "missing_essential": [self.skill_ids[j] for j in np.flatnonzero(missing[i])],
+            })
+        return scores
+
+def coverage(matched: int, total: int) -> dict:
+    return {"matched": matched, "total": total, "coverage": round(matched / total, 4) if total else 0.0}
+
+def main(out: str):
+    relations = load_relations_from_db()
+    tmp = f"{out}.tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["occupation_id", "skill_id", "relation_type"])
+        writer.writerows(relations)
+    os.replace(tmp, out)
+    print(f"Exported {len(relations):,} occupation–skill relations to {pathlib.Path(out)} ✅")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export occupation_skills for the extractor's occupation scoring")
+    parser.add_argument("--out", default="occupation_skills.csv")
+    args = parser.parse_args()
+    main(args.out)
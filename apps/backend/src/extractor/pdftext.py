@@ -0,0 +1,30 @@
+try:
+    import pypdf
+except ImportError:  # /extract/pdf answers 501
+    pypdf = None
+
+# PDF → text for resume uploads, run in pool workers (see app.py). A PDF is
+# read in chunks of pages so big documents are parsed in parallel and their
+# pages can be streamed back as they finish. Workers get the path of a temp
+# file holding the upload rather than its bytes, so the PDF isn't pickled once
+# per chunk.
+
+# (path, reader) of the last PDF opened with reuse=True: a pool worker is
+# single-threaded and usually gets several chunks of the same document
+_last: tuple[str, object] | None = None
+
+def open_pdf(path: str, reuse: bool = False):
+    global _last
+    if reuse and _last is not None and _last[0] == path:
+        return _last[1]
+    reader = pypdf.PdfReader(path)
+    if reader.is_encrypted:
+        reader.decrypt("")
+    if reuse:
+        _last = (path, reader)
+    return reader
+
+def extract_pages(path: str, start: int, stop: int, reuse: bool = False) -> tuple[int, list[str]]:
+    # Returns (total page count, text of pages start..stop-1)
+    pages = open_pdf(path, reuse).pages
+    return len(pages), [pages[i].extract_text() or "" for i in range(start, min(stop, len(pages)))]
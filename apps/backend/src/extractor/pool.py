@@ -0,0 +1,48 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Process pool for the CPU-bound matching. Workers are forked from a process
+# that already holds the nlp pipeline and matcher, so they start preloaded and
+# share those pages copy-on-write. Admission control caps the number of
+# pending chunks so bursts get a fast 503 instead of an ever-growing queue.
+
+class PoolSaturated(Exception):
+    pass
+
+class MatcherPool:
+    def __init__(self, workers: int, max_pending: int, version: str | None = None):
+        self.version = version
+        self.max_pending = max_pending
+        self.pending = 0
+        self.executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork"))
+        # With the fork context every worker is started on the first submit;
+        # do it now so they snapshot the matcher that belongs to `version`
+        # (None for pools whose work doesn't depend on the matcher)
+        self.executor.submit(os.getpid).result()
+
+    async def map(self, fn, chunks: list[tuple], admit: bool = True) -> list:
+        # Called from the event loop only, so `pending` needs no lock
+        if admit and self.pending >= self.max_pending:
+            raise PoolSaturated()
+        self.pending += len(chunks)
+        try:
+            futures = [asyncio.wrap_future(self.executor.submit(fn, *args)) for args in chunks]
+            return await asyncio.gather(*futures)
+        finally:
+            self.pending -= len(chunks)
+
+    def alive(self) -> bool:
+        # A worker that died (OOM kill, segfault) breaks the executor for good;
+        # submit() then raises right away, without waiting for a worker
+        try:
+            self.executor.submit(os.getpid)
+        except BrokenProcessPool:
+            return False
+        return True
+
+    def shutdown(self):
+        # Already submitted chunks still run to completion on the old workers
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,183 @@
+import argparse
+import gc
+import multiprocessing
+import os
+import signal
+import socket
+import tempfile
+import time
+
+import uvicorn
+
+# Prefork launcher: load the nlp pipeline and matcher once in the parent, then
+# fork workers that share those pages copy-on-write, instead of
+# `uvicorn --workers N` reloading the model and recompiling patterns N times.
+# Alias-map reloads (SIGHUP, /admin/reload or EXTRACTOR_RELOAD_INTERVAL) also
+# happen once in the parent, which then replaces its workers with fresh forks.
+
+def read_memory_kb(pid: int) -> dict[str, int]:
+    # Pss splits shared pages between the processes mapping them, so the sum of
+    # Pss over workers is their real footprint; Rss counts shared pages in full
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in ("Rss", "Pss"):
+                    fields[name.lower()] = int(rest.split()[0])
+    except OSError:
+        pass
+    return fields
+
+def counting(app, counters, slot: int):
+    # Count completed HTTP requests per worker in shared memory
+    async def wrapped(scope, receive, send):
+        await app(scope, receive, send)
+        if scope["type"] == "http":
+            counters[slot] += 1
+    return wrapped
+
+def run_worker(sock: socket.socket, app, counters, slot: int):
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGHUP, signal.SIG_DFL)
+    config = uvicorn.Config(counting(app, counters, slot), lifespan="on", log_level="warning")
+    uvicorn.Server(config).run(sockets=[sock])
+
+def main(host: str, port: int, workers: int, report_interval: float):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # Metrics from all workers are aggregated through files in this directory;
+    # it has to be set before prometheus_client is imported
+    if os.getenv("EXTRACTOR_METRICS") == "1" and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="extractor-metrics-")
+
+    os.environ["EXTRACTOR_SERVE_PID"] = str(os.getpid())
+    start = time.perf_counter()
+    import app as extractor  # loads nlp + matcher, once
+    app = extractor.app
+    print(f"Loaded extractor in {time.perf_counter() - start:.2f}s, forking {workers} workers on {host}:{port}")
+
+    # Move everything loaded so far out of the GC's tracked generations, so
+    # collections in the workers don't write to (and un-share) those pages
+    gc.collect()
+    gc.freeze()
+
+    counters = multiprocessing.RawArray("Q", workers)
+    children: dict[int, int] = {}  # pid → slot
+
+    def spawn(slot: int):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(sock, app, counters, slot)
+            finally:
+                os._exit(0)
+        children[pid] = slot
+
+    for slot in range(workers):
+        spawn(slot)
+
+    stopping = False
+    retiring: set[int] = set()  # workers forked from an old matcher, finishing their requests
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children) + list(retiring):
+            os.kill(pid, signal.SIGTERM)
+
+    reload_requested = False
+
+    def request_reload(signum, frame):
+        nonlocal reload_requested
+        reload_requested = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGHUP, request_reload)
+
+    def reload():
+        # Load and warm the new map here, then fork new workers from it and let
+        # the old ones drain (uvicorn finishes in-flight requests on SIGTERM)
+        version = extractor.current.version
+        extractor.reload_lock.acquire()
+        if not extractor.reload_matcher():
+            return False
+        if extractor.current.version != version:
+            gc.unfreeze()
+            gc.collect()
+            gc.freeze()
+            for pid, slot in list(children.items()):
+                spawn(slot)
+                del children[pid]
+                retiring.add(pid)
+                os.kill(pid, signal.SIGTERM)
+            print(f"Re-forked {len(children)} workers on alias map {extractor.current.version}")
+        return True
+
+    reload_interval = extractor.RELOAD_INTERVAL
+    last_mtime = None
+    next_check = time.perf_counter()
+
+    last_total, last_time = 0, time.perf_counter()
+    next_report = last_time + report_interval
+    while children or retiring:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+                from prometheus_client import multiprocess
+                multiprocess.mark_process_dead(pid)
+            if pid in retiring:
+                retiring.discard(pid)
+                continue
+            slot = children.pop(pid)
+            if not stopping:
+                print(f"Worker {pid} exited, restarting slot {slot}")
+                spawn(slot)
+            continue
+
+        now = time.perf_counter()
+        if reload_interval > 0 and now >= next_check and not stopping:
+            # Same polling as app.watch_alias_source, which workers skip under serve.py
+            try:
+                mtime = extractor.alias_source().stat().st_mtime
+            except FileNotFoundError:
+                mtime = last_mtime
+            if last_mtime is None:
+                last_mtime = mtime
+            elif mtime != last_mtime and reload():
+                last_mtime = mtime
+            next_check = now + reload_interval
+        if reload_requested and not stopping:
+            reload_requested = False
+            reload()
+        if report_interval > 0 and now >= next_report:
+            total = sum(counters)
+            rate = (total - last_total) / (now - last_time)
+            per_worker = []
+            pss_total = 0
+            for child_pid, slot in sorted(children.items(), key=lambda item: item[1]):
+                mem = read_memory_kb(child_pid)
+                pss_total += mem.get("pss", 0)
+                per_worker.append(f"w{slot}:{mem.get('rss', 0) // 1024}MB rss/{mem.get('pss', 0) // 1024}MB pss/{counters[slot]} req")
+            print(f"{rate:.1f} req/s, {total} total, {pss_total // 1024}MB pss | " + " ".join(per_worker))
+            last_total, last_time = total, now
+            next_report = now + report_interval
+        time.sleep(0.2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the extractor with preloaded, forked workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("EXTRACTOR_WORKERS", os.cpu_count() or 1)))
+    parser.add_argument("--report_interval", type=float, default=60.0, help="Seconds between RSS/throughput reports (0 = off)")
+    args = parser.parse_args()
+    main(args.host, args.port, args.workers, args.report_interval)
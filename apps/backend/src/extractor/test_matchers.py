@@ -0,0 +1,84 @@
+import random
+
+import pytest
+import spacy
+
+from alias_index import AliasIndex, build_index
+from matchers import AhoCorasickEngine, PhraseMatcherEngine, build_matcher, split_windows
+
+VOCAB = ["python", "sql", "machine", "learning", "data", "analysis", "C++", "node.js", "Project", "management", "go"]
+
+@pytest.fixture(scope="module")
+def nlp():
+    return spacy.blank("en")
+
+def random_alias_map(rng: random.Random, n: int = 60) -> dict[str, str]:
+    alias2id = {}
+    for i in range(n):
+        alias = " ".join(rng.choices(VOCAB, k=rng.randint(1, 4)))
+        alias2id[alias] = f"s{i % 25}"
+    return alias2id
+
+def random_text(rng: random.Random, n_words: int) -> str:
+    words = rng.choices(VOCAB + ["and", "with", "the", "MACHINE", "Sql,"], k=n_words)
+    return "".join(word + rng.choice([" ", " ", " ", "  ", "\n", ". "]) for word in words)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_engines_agree(nlp, tmp_path, seed):
+    rng = random.Random(seed)
+    alias2id = random_alias_map(rng)
+    path = tmp_path / "index.bin"
+    path.write_bytes(build_index(alias2id, nlp, "LOWER"))
+    index = AliasIndex(str(path))
+    engines = [
+        PhraseMatcherEngine(nlp, alias2id),
+        AhoCorasickEngine(nlp, alias2id),
+        build_matcher("aho", nlp, {}, "LOWER", index),
+    ]
+    assert len({engine.max_length for engine in engines}) == 1
+    for _ in range(20):
+        doc = nlp(random_text(rng, 80))
+        expected = set(engines[0](doc))
+        for engine in engines[1:]:
+            assert set(engine(doc)) == expected
+
+def test_index_roundtrip(nlp, tmp_path):
+    alias2id = random_alias_map(random.Random(7))
+    path = tmp_path / "index.bin"
+    path.write_bytes(build_index(alias2id, nlp, "LOWER", watermark="2026-01-01T00:00:00"))
+    index = AliasIndex(str(path))
+    assert index.alias2id() == alias2id
+    assert index.watermark == "2026-01-01T00:00:00"
+    assert index.skill_ids == sorted(set(alias2id.values()))
+
+def test_index_attr_mismatch(nlp, tmp_path):
+    path = tmp_path / "index.bin"
+    path.write_bytes(build_index({"python": "s1"}, nlp, "LOWER"))
+    with pytest.raises(ValueError):
+        build_matcher("aho", nlp, {}, "LEMMA", AliasIndex(str(path)))
+
+def char_spans(nlp, engine, text: str, offset: int = 0) -> set[tuple[int, int, str]]:
+    doc = nlp(text)
+    return {(offset + doc[s:e].start_char, offset + doc[s:e].end_char, skill_id) for skill_id, s, e in engine(doc)}
+
+@pytest.mark.parametrize("seed", range(5))
+def test_windows_lose_no_match(nlp, seed):
+    # Matching window by window finds exactly what matching the whole text does
+    rng = random.Random(seed)
+    engine = AhoCorasickEngine(nlp, random_alias_map(rng))
+    overlap = engine.max_length - 1
+    for size in (40, 120, 300):
+        text = random_text(rng, 300)
+        windows = list(split_windows(text, size, overlap))
+        assert len(windows) > 1
+        assert all(text[offset : offset + len(window)] == window for offset, window in windows)
+        windowed = set().union(*(char_spans(nlp, engine, window, offset) for offset, window in windows))
+        assert windowed == char_spans(nlp, engine, text)
+
+def test_windows_are_bounded():
+    size = 100_000
+    for text in ["python " + "x" * 1_100_000, "x" * 300_000, "sql" + " " * 500_000 + "python", "ab " * 200_000]:
+        windows = list(split_windows(text, size, 9))
+        assert all(len(window) <= 2 * size for _, window in windows)
+        assert all(text[offset : offset + len(window)] == window for offset, window in windows)
+    assert list(split_windows("python sql", size, 9)) == [(0, "python sql")]
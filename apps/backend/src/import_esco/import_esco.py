@@ -1,19 +1,23 @@
+import argparse
+import io
+import json
 import os
+import time
 import pandas as pd
 from sqlalchemy import create_engine, Column, Text, DateTime
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 import uuid
-from sqlalchemy import text
 
 load_dotenv()  # 讀取 .env
 
-CSV_PATH = "C:/Users/colle/Desktop/Project/JobSearch/career-compass/apps/backend/src/import_esco/skills_en.csv"
+CSV_PATH = os.getenv("ESCO_SKILLS_CSV", "C:/Users/colle/Desktop/Project/JobSearch/career-compass/apps/backend/src/import_esco/skills_en.csv")
 DB_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DB_URL, echo=False)
+# CSV rows parsed and COPYed per chunk: bounds the memory held at any time
+COPY_CHUNK_ROWS = 20_000
+
 Base = declarative_base()
 
 class EscoSkill(Base):
@@ -23,41 +27,145 @@ class EscoSkill(Base):
     id          = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     label       = Column(Text, nullable=False)
     alt_labels  = Column(JSONB, default=list)   # 改成 JSONB
-    skill_type  = Column(Text)                  
-    status      = Column(Text)                  
+    skill_type  = Column(Text)
+    status      = Column(Text)
     modified_at = Column(DateTime)
     description = Column(Text)
+    synced_at   = Column(DateTime)  # 每次 insert/update/soft-delete 都更新，alias_index.py 的 watermark
+
+COLUMNS = ["id", "label", "alt_labels", "skill_type", "status", "modified_at", "description"]
+CONTENT_COLUMNS = COLUMNS[1:]
+
+# Skills missing from a sync are kept (JobSkill/OccupationSkill still point at
+# them) and marked with this status instead
+DELETED_STATUS = "deleted"
+
+def content_hash(alias: str) -> str:
+    # Same expression on both tables, so unchanged rows compare equal
+    return f"md5(ROW({', '.join(f'{alias}.{col}' for col in CONTENT_COLUMNS)})::text)"
+
+def read_skills(csv_path: str):
+    # 分塊讀 CSV 並處理，每次 yield 一個處理好的 chunk；重複的 id 只保留第一次出現的
+    seen_ids: set[str] = set()
+    for chunk in pd.read_csv(csv_path, delimiter=",", keep_default_na=False, chunksize=COPY_CHUNK_ROWS):
+        df = (
+            chunk
+              .query("status == 'released'")   # 只要 released 狀態
+              .rename(columns={
+                  "conceptUri":  "id",
+                  "preferredLabel": "label",
+                  "altLabels":   "alt_labels",
+                  "skillType":   "skill_type",
+                  "modifiedDate":"modified_at",
+                  "description": "description"
+              })
+              .loc[:, COLUMNS]
+        )
+
+        # UUID 只取字串，COPY 由 Postgres 轉型
+        df["id"] = df["id"].str.extract(r"([0-9a-f\-]{36})")[0]
+        # 空的 modifiedDate 不是合法 timestamp，寫 NULL；其他欄位的空字串照原樣保留
+        df["modified_at"] = df["modified_at"].replace("", None)
+        df = df.drop_duplicates("id").loc[lambda d: ~d["id"].isin(seen_ids)]
+        seen_ids.update(df["id"])
+        if df.empty:
+            continue
+
+        # alt_labels 用換行拆成 list，再轉成 JSON 文字給 JSONB 欄位
+        df["alt_labels"] = df["alt_labels"].apply(
+            lambda x: json.dumps([label.strip() for label in str(x).split("\n") if label.strip()], ensure_ascii=False)
+        )
+        yield df
+
+def copy_into(cursor, table: str, chunks) -> int:
+    # Stream each parsed chunk through COPY ... FROM STDIN as CSV. Missing
+    # values are written as an explicit \N, so empty strings stay '' like the
+    # old row-by-row insert stored them. Returns rows copied.
+    sql = f"COPY {table} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    rows = 0
+    for df in chunks:
+        buf = io.StringIO()
+        df.to_csv(buf, index=False, header=False, na_rep="\\N")
+        buf.seek(0)
+        cursor.copy_expert(sql, buf)
+        rows += len(df)
+    return rows
+
+def replace_skills(cursor) -> dict:
+    cursor.execute("DELETE FROM core.esco_skills")
+    deleted = cursor.rowcount
+    cursor.execute(
+        f"INSERT INTO core.esco_skills ({', '.join(COLUMNS)}, synced_at) "
+        f"SELECT {', '.join(COLUMNS)}, now() FROM esco_skills_staging"
+    )
+    return {"inserted": cursor.rowcount, "deleted": deleted}
+
+def sync_skills(cursor) -> dict:
+    # 只寫入有變動的列：比對 id 與內容 hash
+    cursor.execute("ANALYZE esco_skills_staging")
+    cursor.execute(
+        f"UPDATE core.esco_skills t SET {', '.join(f'{col} = s.{col}' for col in CONTENT_COLUMNS)}, synced_at = now() "
+        f"FROM esco_skills_staging s "
+        f"WHERE t.id = s.id AND {content_hash('t')} <> {content_hash('s')}"
+    )
+    updated = cursor.rowcount
+    cursor.execute(
+        f"INSERT INTO core.esco_skills ({', '.join(COLUMNS)}, synced_at) "
+        f"SELECT {', '.join(COLUMNS)}, now() FROM esco_skills_staging s "
+        f"WHERE NOT EXISTS (SELECT 1 FROM core.esco_skills t WHERE t.id = s.id)"
+    )
+    inserted = cursor.rowcount
+    # modified_at stays ESCO's date; synced_at moves so alias_index.py's incremental build sees the removal
+    cursor.execute(
+        "UPDATE core.esco_skills t SET status = %s, synced_at = now() "
+        "WHERE t.status IS DISTINCT FROM %s "
+        "AND NOT EXISTS (SELECT 1 FROM esco_skills_staging s WHERE s.id = t.id)",
+        (DELETED_STATUS, DELETED_STATUS),
+    )
+    return {"inserted": inserted, "updated": updated, "soft_deleted": cursor.rowcount}
+
+def main(csv_path: str, mode: str):
+    engine = create_engine(DB_URL, echo=False)
+
+    # 建表（如果尚未建立）
+    Base.metadata.create_all(engine)
+    # create_all 不會替已存在的表加欄位；synced_at 只在這支 script 管理的 core.esco_skills，
+    # alias_index.py 也讀同一張表
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ALTER TABLE core.esco_skills ADD COLUMN IF NOT EXISTS synced_at timestamp")
+
+    start = time.perf_counter()
+
+    # COPY 進暫存表，再在同一個 transaction 裡 sync 或替換 esco_skills：
+    # 讀取端在 commit 前一直看到舊資料，不會看到空表
+    conn = engine.raw_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMP TABLE esco_skills_staging (LIKE core.esco_skills INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            n_rows = copy_into(cursor, "esco_skills_staging", read_skills(csv_path))
+            counts = sync_skills(cursor) if mode == "sync" else replace_skills(cursor)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    if mode == "sync":
+        counts["unchanged"] = n_rows - counts["inserted"] - counts["updated"]
+    summary = ", ".join(f"{name} {count:,}" for name, count in counts.items())
+    print(f"Imported {n_rows:,} skills into Postgres ({mode}: {summary}) in {time.perf_counter() - start:.1f}s ✅")
 
-# 建表（如果尚未建立）
-Base.metadata.create_all(engine)
-
-# 讀 CSV 並處理
-df = (
-    pd.read_csv(CSV_PATH, delimiter=",", keep_default_na=False)
-      .query("status == 'released'")   # 只要 released 狀態
-      .rename(columns={
-          "conceptUri":  "id",
-          "preferredLabel": "label",
-          "altLabels":   "alt_labels",
-          "skillType":   "skill_type",
-          "modifiedDate":"modified_at",
-          "description": "description"
-      })
-      .loc[:, ["id","label","alt_labels","skill_type","status","modified_at","description"]]
-)
-
-# 轉換 UUID 字串成 uuid.UUID 物件
-df["id"] = df["id"].str.extract(r"([0-9a-f\-]{36})")[0].apply(uuid.UUID)
-
-# alt_labels 用換行拆成 list
-df["alt_labels"] = df["alt_labels"].apply(
-    lambda x: [label.strip() for label in str(x).split("\n") if label.strip()]
-)
-
-# 寫入資料庫，先清空再批量插入
-with Session(engine) as session:
-    session.execute(text('DELETE FROM core.esco_skills'))
-    session.bulk_insert_mappings(EscoSkill, df.to_dict(orient="records"))
-    session.commit()
-
-print(f"Imported {len(df):,} skills into Postgres ✅")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load ESCO skills_en.csv into core.esco_skills")
+    parser.add_argument("--csv", default=CSV_PATH, help="Path to ESCO skills CSV (default: ESCO_SKILLS_CSV)")
+    parser.add_argument(
+        "--mode",
+        default="sync",
+        choices=["sync", "replace"],
+        help="sync: insert/update changed rows and soft-delete missing ones; replace: DELETE + reinsert everything",
+    )
+    args = parser.parse_args()
+    main(args.csv, args.mode)
@@ -1,5 +1,9 @@
 import argparse
+import json
 import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import pandas as pd
 from sqlalchemy import (
     Column,
@@ -12,7 +16,8 @@ from sqlalchemy import (
     PrimaryKeyConstraint,
 )
 from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import DataError, DBAPIError, IntegrityError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeout
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -20,6 +25,17 @@ load_dotenv()
 RELATION_TYPES = ("essential", "optional")
 SKILL_TYPES = ("knowledge", "skill/competence")
 
+# Mapping rows parsed and written per chunk
+CHUNK_ROWS = 10_000
+
+# Concurrent batch writers, one pooled connection each
+WRITERS = int(os.getenv("INGEST_WRITERS", str(min(os.cpu_count() or 1, 8))))
+
+# Transient errors (connection lost, pool timeout, deadlock) are retried with
+# exponential backoff from RETRY_DELAY seconds; after RETRIES the import aborts
+RETRIES = 5
+RETRY_DELAY = 0.5
+
 def extract_uuid(uri: str) -> str:
     return uri.rstrip("/").split("/")[-1]
 
@@ -73,25 +89,122 @@ def create_schema(engine):
     print("Tables in metadata:", meta.tables.keys())
     return meta
 
-def bulk_upsert(table: Table, rows: list[dict], engine, key_cols: list[str], batch_size: int = 1000):
+class BatchSizer:
+    # Tunes the batch size on total rows/sec across all writers: every
+    # bulk_upsert call reports its rows and wall time, `window` calls at the
+    # current size are averaged, then the size keeps scaling in the direction
+    # that last improved throughput and turns around when it drops.
+    # max_size should leave a chunk enough batches to keep every writer busy.
+    def __init__(self, size: int = 1000, min_size: int = 100, max_size: int = CHUNK_ROWS // WRITERS, factor: float = 1.5, window: int = 4):
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size)
+        self.size = min(max(size, self.min_size), self.max_size)
+        self.factor = factor
+        self.window = window
+        self.last_rate = None
+        self.rows = self.seconds = self.samples = 0
+
+    def record(self, rows: int, seconds: float):
+        self.rows += rows
+        self.seconds += seconds
+        self.samples += 1
+        if self.samples < self.window:
+            return
+        rate = self.rows / max(self.seconds, 1e-6)
+        if self.last_rate is not None and rate < self.last_rate:
+            self.factor = 1 / self.factor
+        self.last_rate = rate
+        self.rows = self.seconds = self.samples = 0
+        self.size = int(min(max(self.size * self.factor, self.min_size), self.max_size))
+
+# One sizer per table, kept across calls: rows of different tables differ in width
+SIZERS: dict[str, BatchSizer] = {}
+
+class DeadLetter:
+    # Rows that still fail on their own after bisection: one JSON line each with
+    # the table and the database error, appended to `path` for fixing and replay
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def add(self, table: str, row: dict, error: Exception):
+        message = str(getattr(error, "orig", None) or error).strip().splitlines()[0]
+        line = json.dumps({"table": table, "row": row, "error": message}, ensure_ascii=False, default=str)
+        with self.lock:
+            self.count += 1
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            else:
+                print(f"Failed row: {line}")
+
+def bulk_upsert(
+    table: Table,
+    rows: list[dict],
+    engine,
+    key_cols: list[str],
+    batch_size: int | None = None,
+    writers: int = WRITERS,
+    dead_letter: DeadLetter | None = None,
+) -> int:
+    # batch_size=None tunes the size per table; writers should not exceed the engine's pool.
+    # Returns the number of rows that could not be written.
     if not rows:
-        return
-    with engine.connect() as conn:
-        for i in range(0, len(rows), batch_size):
-            batch = rows[i : i + batch_size]
-            stmt = (
-                insert(table)
-                .values(batch)
-                .on_conflict_do_nothing(index_elements=key_cols)
-            )
-            try:
-                with conn.begin():
-                    conn.execute(stmt)
-            except SQLAlchemyError as e:
-                print(f"Error inserting batch starting at row {i}: {e}")
-                # 繼續執行其他批次
-
-def main(mapping_file: str):
+        return 0
+    dead_letter = dead_letter or DeadLetter()
+    # 只編譯一次：每批用同一個 statement 做 executemany
+    stmt = insert(table).on_conflict_do_nothing(index_elements=key_cols)
+    if batch_size:
+        sizer = None
+    elif table.name not in SIZERS:
+        sizer = SIZERS[table.name] = BatchSizer(max_size=CHUNK_ROWS // writers)
+    else:
+        sizer = SIZERS[table.name]
+
+    def write(batch: list[dict], attempt: int = 0) -> int:
+        try:
+            with engine.begin() as conn:
+                conn.execute(stmt, batch)
+        except (IntegrityError, DataError) as e:
+            # Row-level data errors only. 二分重試：失敗的批次拆成兩半各自寫入，
+            # 好的列照常寫入，只有出錯的列進 dead letter
+            if len(batch) == 1:
+                dead_letter.add(table.name, batch[0], e)
+                return 1
+            mid = len(batch) // 2
+            return write(batch[:mid]) + write(batch[mid:])
+        except (DBAPIError, PoolTimeout) as e:
+            # The database, not the rows: never dead-letter these. Anything not
+            # transient (permissions, bad SQL) aborts right away.
+            transient = isinstance(e, (OperationalError, PoolTimeout)) or e.connection_invalidated
+            if not transient or attempt >= RETRIES:
+                raise
+            delay = RETRY_DELAY * 2**attempt
+            print(f"Transient error writing {table.name}, retrying in {delay:.1f}s: {str(e).splitlines()[0]}")
+            time.sleep(delay)
+            return write(batch, attempt + 1)
+        return 0
+
+    # At most 2 × writers batches are in flight
+    failed = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(writers) as executor:
+        pending = set()
+        i = 0
+        while i < len(rows):
+            if len(pending) >= writers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                failed += sum(future.result() for future in done)
+            size = batch_size or sizer.size
+            pending.add(executor.submit(write, rows[i : i + size]))
+            i += size
+        failed += sum(future.result() for future in pending)
+    if sizer is not None:
+        sizer.record(len(rows), time.perf_counter() - start)
+    return failed
+
+def main(mapping_file: str, writers: int, batch_size: int | None, dead_letter_file: str):
     required_env_vars = ["PGHOST", "PGPORT", "PGDATABASE", "PGUSER", "PGPASSWORD"]
     missing_vars = [var for var in required_env_vars if not os.getenv(var)]
     if missing_vars:
@@ -99,7 +212,9 @@ def main(mapping_file: str):
 
     engine = create_engine(
         f"postgresql+psycopg2://{os.getenv('PGUSER')}:{os.getenv('PGPASSWORD')}@"
-        f"{os.getenv('PGHOST')}:{os.getenv('PGPORT')}/{os.getenv('PGDATABASE')}"
+        f"{os.getenv('PGHOST')}:{os.getenv('PGPORT')}/{os.getenv('PGDATABASE')}",
+        pool_size=writers,
+        max_overflow=0,
     )
 
     meta = create_schema(engine)
@@ -109,51 +224,85 @@ def main(mapping_file: str):
     skill_tbl = meta.tables["public.esco_skills"]
     occ_skill_tbl = meta.tables["public.occupation_skills"]
 
-    # 讀取TSV檔，注意分隔符號是 tab
-    mapping = pd.read_csv(mapping_file)  
-    mapping = mapping.rename(
-        columns={
-            "occupationUri": "occupation_uri",
-            "relationType": "relation_type",
-            "skillType": "skill_type",
-            "skillUri": "skill_uri",
-        }
-    )
+    dead_letter = DeadLetter(dead_letter_file)
 
-    mapping["occupation_id"] = mapping["occupation_uri"].apply(extract_uuid)
-    mapping["skill_id"] = mapping["skill_uri"].apply(extract_uuid)
-    mapping['skill_type'] = mapping['skill_type'].fillna('knowledge')
+    # 分塊讀取 CSV：每個 chunk 解析完就寫入，記憶體不隨檔案大小增長
+    seen_occupations: set[str] = set()
+    seen_skills: set[str] = set()
+    n_links = 0
+    for chunk in pd.read_csv(mapping_file, chunksize=CHUNK_ROWS):
+        mapping = chunk.rename(
+            columns={
+                "occupationUri": "occupation_uri",
+                "relationType": "relation_type",
+                "skillType": "skill_type",
+                "skillUri": "skill_uri",
+            }
+        )
 
-    unique_occupations = (
-        mapping[["occupation_id", "occupation_uri"]]
-        .drop_duplicates()
-        .rename(columns={"occupation_id": "id", "occupation_uri": "uri"})
-        .to_dict("records")
-    )
-    unique_skills = (
-        mapping[["skill_id", "skill_uri"]]
-        .drop_duplicates()
-        .rename(columns={"skill_id": "id", "skill_uri": "uri"})
-        .to_dict("records")
-    )
+        mapping["occupation_id"] = mapping["occupation_uri"].apply(extract_uuid)
+        mapping["skill_id"] = mapping["skill_uri"].apply(extract_uuid)
+        mapping['skill_type'] = mapping['skill_type'].fillna('knowledge')
 
-    bulk_upsert(occ_tbl, unique_occupations, engine, ["id"])
-    bulk_upsert(skill_tbl, unique_skills, engine, ["id"])
+        # Only ids not seen in earlier chunks; links need both rows to exist first
+        new_occupations = (
+            mapping[["occupation_id", "occupation_uri"]]
+            .drop_duplicates("occupation_id")
+            .loc[lambda df: ~df["occupation_id"].isin(seen_occupations)]
+        )
+        new_skills = (
+            mapping[["skill_id", "skill_uri"]]
+            .drop_duplicates("skill_id")
+            .loc[lambda df: ~df["skill_id"].isin(seen_skills)]
+        )
+        seen_occupations.update(new_occupations["occupation_id"])
+        seen_skills.update(new_skills["skill_id"])
 
-    link_rows = mapping[
-        [
-            "occupation_id",
-            "skill_id",
-            "relation_type",
-            "skill_type",
-        ]
-    ].to_dict("records")
+        bulk_upsert(
+            occ_tbl,
+            new_occupations.rename(columns={"occupation_id": "id", "occupation_uri": "uri"}).to_dict("records"),
+            engine,
+            ["id"],
+            batch_size,
+            writers,
+            dead_letter,
+        )
+        bulk_upsert(
+            skill_tbl,
+            new_skills.rename(columns={"skill_id": "id", "skill_uri": "uri"}).to_dict("records"),
+            engine,
+            ["id"],
+            batch_size,
+            writers,
+            dead_letter,
+        )
 
-    bulk_upsert(occ_skill_tbl, link_rows, engine, ["occupation_id", "skill_id"])
-    print(f"Inserted {len(link_rows):,} occupation–skill links.")
+        link_rows = mapping[
+            [
+                "occupation_id",
+                "skill_id",
+                "relation_type",
+                "skill_type",
+            ]
+        ].to_dict("records")
+
+        failed_links = bulk_upsert(
+            occ_skill_tbl, link_rows, engine, ["occupation_id", "skill_id"], batch_size, writers, dead_letter
+        )
+        n_links += len(link_rows) - failed_links
+
+    print(
+        f"Inserted {n_links:,} occupation–skill links "
+        f"({len(seen_occupations):,} occupations, {len(seen_skills):,} skills)."
+    )
+    if dead_letter.count:
+        print(f"{dead_letter.count:,} rows failed and were written to {dead_letter.path}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--mapping_file", required=True, help="Path to ESCO occupation–skill TSV")
+    parser.add_argument("--writers", type=int, default=WRITERS, help="Concurrent DB writers (default: INGEST_WRITERS)")
+    parser.add_argument("--batch_size", type=int, help="Fixed rows per batch (default: tuned from rows/sec)")
+    parser.add_argument("--dead_letter", default="ingest_dead_letter.jsonl", help="JSONL file for rows that failed to insert")
     args = parser.parse_args()
-    main(args.mapping_file)
+    main(args.mapping_file, args.writers, args.batch_size, args.dead_letter)
@@ -0,0 +1,120 @@
+import contextlib
+import json
+import threading
+
+import pytest
+from sqlalchemy import Column, MetaData, String, Table
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+
+import ingest_esco
+from ingest_esco import BatchSizer, DeadLetter, bulk_upsert
+
+class FakeEngine:
+    # Stands in for a SQLAlchemy engine: records every batch it is given, or
+    # raises what fail(batch) returns instead of writing it
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.attempts = 0
+        self.batches: list[list[dict]] = []
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def begin(self):
+        yield self
+
+    def execute(self, stmt, batch):
+        with self.lock:
+            self.attempts += 1
+            error = self.fail(batch) if self.fail else None
+            if error is not None:
+                raise error
+            self.batches.append(batch)
+
+    def written(self) -> list[dict]:
+        return [row for batch in self.batches for row in batch]
+
+def make_table(name: str = "rows") -> Table:
+    return Table(name, MetaData(), Column("id", String, primary_key=True))
+
+def simulate(sizer: BatchSizer, writers: int, calls: int, cost) -> list[int]:
+    # Each call writes a CHUNK_ROWS chunk as batches spread over `writers`;
+    # cost(size) is the seconds one batch takes
+    rows = ingest_esco.CHUNK_ROWS
+    sizes = []
+    for _ in range(calls):
+        sizer.record(rows, rows / sizer.size / writers * cost(sizer.size))
+        sizes.append(sizer.size)
+    return sizes
+
+def test_sizer_finds_the_best_size():
+    # Per-batch overhead vs. per-row cost growing with batch size: total
+    # throughput peaks at 1000 rows
+    sizer = BatchSizer(size=200, max_size=2500)
+    sizes = simulate(sizer, 4, 80, lambda size: 0.01 + 1e-5 * size + 1e-8 * size**2)
+    assert all(1000 / 1.5**2 <= size <= 1000 * 1.5**2 for size in sizes[-20:])
+
+def test_sizer_stays_within_bounds():
+    sizer = BatchSizer(size=5000, min_size=100, max_size=ingest_esco.CHUNK_ROWS // 8)
+    assert sizer.size == ingest_esco.CHUNK_ROWS // 8
+    # A fixed cost per batch: bigger is always faster, up to the cap
+    assert set(simulate(sizer, 8, 40, lambda size: 0.05)) == {ingest_esco.CHUNK_ROWS // 8}
+    # Cost growing faster than the batch: smaller is always faster, down to the floor
+    sizer = BatchSizer(size=1000, min_size=100, max_size=2500)
+    assert simulate(sizer, 4, 60, lambda size: 1e-6 * size**2)[-10:] == [100] * 10
+
+def test_bulk_upsert_feeds_sizer_per_call(monkeypatch):
+    monkeypatch.setattr(ingest_esco, "SIZERS", {})
+    engine = FakeEngine()
+    rows = [{"id": str(i)} for i in range(1000)]
+    failed = bulk_upsert(make_table(), rows, engine, ["id"], writers=4)
+    sizer = ingest_esco.SIZERS["rows"]
+    assert failed == 0
+    assert sorted(int(row["id"]) for row in engine.written()) == list(range(1000))
+    assert sizer.max_size == ingest_esco.CHUNK_ROWS // 4
+    assert (sizer.samples, sizer.rows) == (1, 1000)
+    assert all(len(batch) <= sizer.max_size for batch in engine.batches)
+
+def test_bisection_dead_letters_only_bad_rows(tmp_path):
+    bad = {"7", "500", "501"}
+    engine = FakeEngine(lambda batch: IntegrityError("INSERT", {}, Exception("duplicate key")) if bad & {row["id"] for row in batch} else None)
+    rows = [{"id": str(i)} for i in range(1000)]
+    dead_letter = DeadLetter(str(tmp_path / "dead.jsonl"))
+    failed = bulk_upsert(make_table(), rows, engine, ["id"], batch_size=64, writers=4, dead_letter=dead_letter)
+    assert failed == dead_letter.count == 3
+    assert sorted(row["id"] for row in engine.written()) == sorted(row["id"] for row in rows if row["id"] not in bad)
+    lines = [json.loads(line) for line in (tmp_path / "dead.jsonl").read_text().splitlines()]
+    assert sorted(line["row"]["id"] for line in lines) == sorted(bad)
+    assert {line["table"] for line in lines} == {"rows"}
+    assert all("duplicate key" in line["error"] for line in lines)
+
+def test_transient_errors_are_retried(monkeypatch):
+    monkeypatch.setattr(ingest_esco, "RETRY_DELAY", 0)
+    failures = {"left": 2}
+
+    def fail(batch):
+        if failures["left"]:
+            failures["left"] -= 1
+            return OperationalError("INSERT", {}, Exception("server closed the connection"))
+
+    engine = FakeEngine(fail)
+    rows = [{"id": str(i)} for i in range(100)]
+    assert bulk_upsert(make_table(), rows, engine, ["id"], batch_size=100, writers=1) == 0
+    assert engine.attempts == 3
+    assert len(engine.written()) == 100
+
+def test_outage_aborts_without_dead_letters(monkeypatch):
+    monkeypatch.setattr(ingest_esco, "RETRY_DELAY", 0)
+    engine = FakeEngine(lambda batch: OperationalError("INSERT", {}, Exception("connection refused")))
+    dead_letter = DeadLetter()
+    with pytest.raises(OperationalError):
+        bulk_upsert(make_table(), [{"id": "1"}, {"id": "2"}], engine, ["id"], batch_size=2, writers=1, dead_letter=dead_letter)
+    assert engine.attempts == ingest_esco.RETRIES + 1
+    assert dead_letter.count == 0
+
+def test_other_database_errors_abort_at_once():
+    engine = FakeEngine(lambda batch: ProgrammingError("INSERT", {}, Exception("permission denied")))
+    dead_letter = DeadLetter()
+    with pytest.raises(ProgrammingError):
+        bulk_upsert(make_table(), [{"id": "1"}, {"id": "2"}], engine, ["id"], batch_size=2, writers=1, dead_letter=dead_letter)
+    assert engine.attempts == 1
+    assert dead_letter.count == 0
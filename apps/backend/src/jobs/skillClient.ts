@@ -12,3 +12,71 @@ export async function skillExtractor(text: string): Promise<{ skill_ids: number[
         return { skill_ids: [] }; // fallback empty list
     }
 }
+
+export async function skillExtractorBatch(texts: string[]): Promise<{ skill_ids: string[] }[]> {
+    try {
+        const response = await axios.post(`${EXTRACTOR_URL}/batch`, { texts }, { timeout: 60_000 });
+        return response.data.results;
+    } catch (error) {
+        console.error('Batch skill extraction failed:', error);
+        return texts.map(() => ({ skill_ids: [] })); // fallback, keep input order
+    }
+}
+
+export interface PdfExtraction {
+    text: string;
+    pages: number;
+    skill_ids: string[];
+}
+
+// Parses the PDF and extracts its skills in the extractor; null when it is unavailable
+export async function skillExtractorPdf(buffer: Buffer): Promise<PdfExtraction | null> {
+    try {
+        const response = await axios.post(`${EXTRACTOR_URL}/pdf`, buffer, {
+            headers: { 'Content-Type': 'application/pdf' },
+            timeout: 60_000,
+        });
+        return response.data;
+    } catch (error) {
+        console.error('PDF skill extraction failed:', error);
+        return null;
+    }
+}
+
+export interface RawJob {
+    job_description?: string | null;
+    job_highlights?: Record<string, string[]> | null;
+}
+
+// Sends the raw JSearch fields; the extractor strips HTML and normalizes the text itself
+export async function skillExtractorJobs(jobs: RawJob[], normalize: 'html' | 'clean' = 'clean'): Promise<{ skill_ids: string[] }[]> {
+    const payload = jobs.map(job => ({
+        job_description: job.job_description ?? '',
+        job_highlights: job.job_highlights ?? null,
+    }));
+    try {
+        const response = await axios.post(`${EXTRACTOR_URL}/batch`, { jobs: payload, normalize }, { timeout: 60_000 });
+        return response.data.results;
+    } catch (error) {
+        console.error('Job skill extraction failed:', error);
+        return jobs.map(() => ({ skill_ids: [] }));
+    }
+}
+
+export interface FuzzySkillMatch {
+    skill_id: string;
+    alias: string;
+    ngram: string;
+    score: number;
+}
+
+// Offloads the n-gram + Dice matching of utils/extractSkills.ts to the extractor
+export async function skillExtractorFuzzy(texts: string[], threshold?: number): Promise<FuzzySkillMatch[][]> {
+    try {
+        const response = await axios.post(`${EXTRACTOR_URL}/fuzzy`, { texts, threshold }, { timeout: 60_000 });
+        return response.data.results.map((r: { matches: FuzzySkillMatch[] }) => r.matches);
+    } catch (error) {
+        console.error('Fuzzy skill extraction failed:', error);
+        return texts.map(() => []);
+    }
+}
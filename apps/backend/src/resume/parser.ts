@@ -2,6 +2,7 @@
 import { extractTextFromPdf, extractTextFromDocx, extractTextFromTxt } from './fileUtils';
 import { extractSkills, SkillMatch } from '../utils/extractSkills';
 import { getCachedSkills } from '../utils/skillCache';
+import { skillExtractorPdf } from '../jobs/skillClient';
 
 export interface ParsedResume {
     name?: string;
@@ -13,9 +14,17 @@ export interface ParsedResume {
 
 export async function parseResume(buffer: Buffer, mimeType: string): Promise<ParsedResume> {
     let text = '';
+    let extractorSkillIds: string[] | null = null;
 
     if (mimeType === 'application/pdf') {
-        text = await extractTextFromPdf(buffer);
+        // Parse + match in the Python extractor, off the event loop; pdf-parse as fallback
+        const extracted = await skillExtractorPdf(buffer);
+        if (extracted) {
+            text = extracted.text;
+            extractorSkillIds = extracted.skill_ids;
+        } else {
+            text = await extractTextFromPdf(buffer);
+        }
     } else if (mimeType === 'application/vnd.openxmlformats-officedocument.wordprocessingml.document') {
         text = await extractTextFromDocx(buffer);
     } else {
@@ -29,7 +38,15 @@ export async function parseResume(buffer: Buffer, mimeType: string): Promise<Par
     const canonicalSkills = await getCachedSkills();
 
     // ✅ Match against dynamic skills
-    const skills = extractSkills(text, canonicalSkills);
+    let skills: SkillMatch[];
+    if (extractorSkillIds) {
+        const byId = new Map(canonicalSkills.map(skill => [skill.id, skill]));
+        skills = extractorSkillIds
+            .filter(id => byId.has(id))
+            .map(id => ({ skill_name: byId.get(id)!.name, canonical_skill_id: id, source: 'extractor' }));
+    } else {
+        skills = extractSkills(text, canonicalSkills);
+    }
 
     return {
         name: undefined,
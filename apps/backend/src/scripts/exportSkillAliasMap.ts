@@ -4,6 +4,8 @@ import * as fs from 'fs/promises';
 async function exportAliasMap() {
     type SkillType = Awaited<ReturnType<typeof db.skill.findMany>>[number];
     const skills = await db.skill.findMany({
+        // import_esco.py keeps skills ESCO retired, marked as deleted
+        where: { status: { not: 'deleted' } },
         select: {
             id: true,
             label: true,
@@ -8,6 +8,7 @@ let cachedSkills: CanonicalSkill[] | null = null;
 export async function getCachedSkills(): Promise<CanonicalSkill[]> {
     if (!cachedSkills) {
         const skills = await prisma.skill.findMany({
+            where: { status: { not: 'deleted' } },
             select: { id: true, label: true },
         });
         cachedSkills = skills.map(skill => ({